@@ -0,0 +1,133 @@
+"""Benchmark of the cache formats and compressions: file size, save time and load time.
+
+Usage:
+    python -m benchmarks.bench_cache --events 5000
+    python -m benchmarks.bench_cache --formats json compact_json binary
+    python -m benchmarks.bench_cache --formats epoch --compressions none zlib lzma zstd
+"""
+
+import argparse
+import itertools
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from gcsa.event import Event
+
+from gcal_notifier.compressors import COMPRESSORS, zstandard
+from gcal_notifier.event_loader import load_saved_events
+from gcal_notifier.event_saver import save_events
+from gcal_notifier.serializers import SERIALIZERS, msgpack
+
+
+def make_events(count: int) -> List[Event]:
+    """Events like the ones fetched by the getter.
+
+    Args:
+        count (int): Number of events
+
+    Returns:
+        List[Event]: Events, every 30 minutes from now
+    """
+    start = datetime.now(timezone.utc).replace(microsecond=0)
+    events = []
+    for num in range(count):
+        event = Event(
+            f"Event {num}",
+            start=start + timedelta(minutes=30 * num),
+            end=start + timedelta(minutes=30 * num + 30),
+            description=f"Description of event {num}",
+            event_id=f"e{num}",
+            color_id=str(num % 11 + 1),
+        )
+        event.reminders = [10, 0]
+        event.calendar = "Calendar"
+        event.cal_code = "CALENDAR1"
+        events.append(event)
+    return events
+
+
+def timed(func: Callable[[], object], repeat: int) -> float:
+    """Median run time of a function.
+
+    Args:
+        func (Callable[[], object]): Function
+        repeat (int): Number of runs
+
+    Returns:
+        float: Median time, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def benchmark(
+    events: List[Event], formats: List[str], compressions: List[str], repeat: int
+) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """Save and load the events in each format and compression.
+
+    Args:
+        events (List[Event]): Events
+        formats (List[str]): Cache formats
+        compressions (List[str]): Cache compressions
+        repeat (int): Number of runs
+
+    Returns:
+        Dict[Tuple[str, str], Dict[str, float]]: Size, save and load time of
+            each format and compression
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as cache:
+        for cache_format, compression in itertools.product(formats, compressions):
+            file_path = Path(cache) / f"events_{cache_format}_{compression}"
+
+            def save(
+                file_path: Path = file_path,
+                cache_format: str = cache_format,
+                compression: str = compression,
+            ) -> None:
+                file_path.unlink(missing_ok=True)
+                save_events(
+                    events, file_path=file_path, cache_format=cache_format, compression=compression
+                )
+
+            save_time = timed(save, repeat)
+            load_time = timed(lambda file_path=file_path: load_saved_events(file_path), repeat)
+            results[cache_format, compression] = {
+                "size": file_path.stat().st_size,
+                "save": save_time,
+                "load": load_time,
+            }
+    return results
+
+
+def main() -> None:
+    formats = [name for name in SERIALIZERS if name != "msgpack" or msgpack is not None]
+    compressions = ["none", *(name for name in COMPRESSORS if name != "zstd" or zstandard)]
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--events", type=int, default=2000, help="number of events")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs")
+    parser.add_argument("--formats", nargs="+", default=formats, choices=list(SERIALIZERS))
+    parser.add_argument(
+        "--compressions", nargs="+", default=compressions, choices=["none", *COMPRESSORS]
+    )
+    args = parser.parse_args()
+
+    results = benchmark(make_events(args.events), args.formats, args.compressions, args.repeat)
+    print(f"{'format':<14}{'compression':<13}{'size KiB':>10}{'save ms':>10}{'load ms':>10}")
+    for (cache_format, compression), result in results.items():
+        print(
+            f"{cache_format:<14}{compression:<13}{result['size'] / 1024:>10.1f}"
+            f"{result['save'] * 1000:>10.2f}{result['load'] * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
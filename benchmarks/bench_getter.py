@@ -0,0 +1,139 @@
+"""End-to-end benchmark of run_getter against the fake Calendar API.
+
+The getter runs in a spawned process, so its peak RSS does not include the
+fake server. Nothing is sent to Google and the real cache is left alone.
+
+Usage:
+    python -m benchmarks.bench_getter --calendars 50 --events 500 --latency 0.05
+    python -m benchmarks.bench_getter --engine asyncio --recurring 0.2 --expand
+"""
+
+import argparse
+import multiprocessing
+import resource
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from tests.fake_calendar_api import FakeCalendarAPI
+
+
+def run_once(
+    general_params: Dict[str, Any], calendar_params: Dict[str, Any], cache: str
+) -> Dict[str, float]:
+    """Run the getter once with fake credentials, in the current process.
+
+    Args:
+        general_params (Dict[str, Any]): General params
+        calendar_params (Dict[str, Any]): Calendar params
+        cache (str): Cache directory used instead of ~/.cache/gcal_notifier
+
+    Returns:
+        Dict[str, float]: Wall time, in seconds, and peak RSS, in KiB
+    """
+    from gcsa.google_calendar import GoogleCalendar
+    from google.oauth2.credentials import Credentials
+
+    from gcal_notifier import event_getter, main
+    from gcal_notifier.async_getter import AsyncGCalendarGetter
+
+    main.CACHE = event_getter.CACHE = Path(cache)
+    event_getter.SimpleGCalendarGetter.make_conn = staticmethod(
+        lambda calendar, _: GoogleCalendar(calendar, credentials=Credentials("token"))
+    )
+    AsyncGCalendarGetter.access_token = lambda *_: "token"
+
+    start = time.perf_counter()
+    main.run_getter(general_params, calendar_params)
+    wall = time.perf_counter() - start
+    return {"wall": wall, "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def run_child(
+    general_params: Dict[str, Any],
+    calendar_params: Dict[str, Any],
+    cache: str,
+    results: multiprocessing.Queue,
+) -> None:
+    """Entry point of the spawned process."""
+    results.put(run_once(general_params, calendar_params, cache))
+
+
+def benchmark(args: argparse.Namespace) -> List[Dict[str, float]]:
+    """Run the getter against a fake API, once per repeat.
+
+    Args:
+        args (argparse.Namespace): Command line arguments
+
+    Returns:
+        List[Dict[str, float]]: Wall time, peak RSS, requests and bytes of each run
+    """
+    from gcal_notifier.globals import GENERAL_PARAMS
+
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    with FakeCalendarAPI(
+        calendars=args.calendars,
+        events=args.events,
+        page_size=args.page_size,
+        latency=args.latency,
+        recurring=args.recurring,
+        occurrences=args.occurrences,
+    ) as api:
+        general_params = {
+            **GENERAL_PARAMS,
+            "api_url": api.url,
+            "batch_url": api.batch_url,
+            "fetch_engine": args.engine,
+            "fetch_workers": args.workers,
+            "batch_requests": args.batch,
+            "expand_recurrence": args.expand,
+            "stream_events": args.stream,
+            "incremental_sync": args.incremental,
+            "rate_limit": 0,
+        }
+        with tempfile.TemporaryDirectory() as cache:
+            for _ in range(args.repeat):
+                requests, sent = api.requests, api.bytes_sent
+                results = context.Queue()
+                child = context.Process(
+                    target=run_child, args=(general_params, api.calendar_params, cache, results)
+                )
+                child.start()
+                run = results.get()
+                child.join()
+                run.update(requests=api.requests - requests, bytes=api.bytes_sent - sent)
+                runs.append(run)
+    return runs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--calendars", type=int, default=20, help="number of calendars")
+    parser.add_argument("--events", type=int, default=200, help="events per calendar")
+    parser.add_argument("--page-size", type=int, default=250, help="events per result page")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--recurring", type=float, default=0.0, help="share of daily events")
+    parser.add_argument("--occurrences", type=int, default=30, help="occurrences per series")
+    parser.add_argument("--engine", choices=["threads", "asyncio"], default="threads")
+    parser.add_argument("--workers", type=int, default=1, help="fetch_workers")
+    parser.add_argument("--batch", action="store_true", help="batch_requests")
+    parser.add_argument("--expand", action="store_true", help="expand_recurrence")
+    parser.add_argument("--stream", action="store_true", help="stream_events")
+    parser.add_argument("--incremental", action="store_true", help="incremental_sync")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs")
+    args = parser.parse_args()
+
+    runs = benchmark(args)
+    for num, run in enumerate(runs, 1):
+        print(
+            f"run {num}: {run['wall']:.3f} s, {run['requests']} requests, "
+            f"{run['bytes'] / 1024:.1f} KiB, peak RSS {run['rss'] / 1024:.1f} MiB"
+        )
+    print(f"median wall time: {statistics.median(run['wall'] for run in runs):.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+from gcsa.event import Event
+from gcsa.serializers.event_serializer import EventSerializer
+from google.auth.transport.requests import Request
+
+from gcal_notifier.event_getter import DEFAULT_CREDENTIALS, SimpleGCalendarGetter
+
+API_URL = "https://www.googleapis.com/calendar/v3"
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPStatusError(Exception):
+    """Non 2xx answer from the Calendar API.
+
+    Args:
+        status (int): HTTP status code
+        headers (Dict[str, str]): Response headers
+        body (bytes): Response body
+    """
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes) -> None:
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class AsyncHTTPClient:
+    """Minimal asyncio HTTP/1.1 client with keep-alive connections.
+
+    Only what the events list endpoint needs: GET requests returning JSON,
+    with Content-Length or chunked bodies.
+
+    Args:
+        timeout (float): Timeout of each request, in seconds
+
+    Attributes:
+        timeout (float): Timeout of each request, in seconds
+        requests (int): Number of requests sent
+        bytes_received (int): Number of body bytes received
+    """
+
+    timeout: float
+    requests: int
+    bytes_received: int
+
+    def __init__(self, timeout: float = 30.0) -> None:
+        self.timeout = timeout
+        self.requests = 0
+        self.bytes_received = 0
+        self._idle: Dict[Tuple[str, int, bool], List[Connection]] = {}
+
+    async def get_json(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """GET an URL and decode its JSON body.
+
+        Args:
+            url (str): Absolute URL, with query string
+            headers (Optional[Dict[str, str]]): Extra request headers
+
+        Returns:
+            Dict[str, Any]: Decoded JSON body
+
+        Raises:
+            HTTPStatusError: Answer with a non 2xx status
+            asyncio.TimeoutError: Request took longer than the timeout
+        """
+        status, response_headers, body = await asyncio.wait_for(
+            self.request(url, headers or {}), self.timeout
+        )
+        if not 200 <= status < 300:
+            raise HTTPStatusError(status, response_headers, body)
+        return json.loads(body)
+
+    async def request(self, url: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Send a GET request, reusing an idle connection when there is one.
+
+        Args:
+            url (str): Absolute URL, with query string
+            headers (Dict[str, str]): Extra request headers
+
+        Returns:
+            Tuple[int, Dict[str, str], bytes]: (Status, Headers, Body)
+        """
+        parts = urlsplit(url)
+        use_ssl = parts.scheme == "https"
+        key = (parts.hostname, parts.port or (443 if use_ssl else 80), use_ssl)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        lines = [f"GET {target} HTTP/1.1", f"Host: {parts.netloc}", "Accept: application/json"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+        idle = self._idle.setdefault(key, [])
+        while idle:
+            conn = idle.pop()
+            try:
+                return await self.exchange(key, conn, payload)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                continue
+
+        conn = await asyncio.open_connection(key[0], key[1], ssl=use_ssl or None)
+        return await self.exchange(key, conn, payload)
+
+    async def exchange(
+        self, key: Tuple[str, int, bool], conn: Connection, payload: bytes
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """Write a request to a connection and read the response.
+
+        Args:
+            key (Tuple[str, int, bool]): (Host, Port, SSL) of the connection
+            conn (Connection): (Reader, Writer) of the connection
+            payload (bytes): Raw request
+
+        Returns:
+            Tuple[int, Dict[str, str], bytes]: (Status, Headers, Body)
+        """
+        reader, writer = conn
+        try:
+            writer.write(payload)
+            await writer.drain()
+            self.requests += 1
+            status, headers, body = await self.read_response(reader)
+        except BaseException:
+            writer.close()
+            raise
+
+        self.bytes_received += len(body)
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle[key].append(conn)
+        return status, headers, body
+
+    @staticmethod
+    async def read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+        """Read a response from a connection.
+
+        Args:
+            reader (asyncio.StreamReader): Reader of the connection
+
+        Returns:
+            Tuple[int, Dict[str, str], bytes]: (Status, Headers, Body)
+        """
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the server")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        return status, headers, body
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle = {}
+
+
+class AsyncGCalendarGetter(SimpleGCalendarGetter):
+    """Connector to fetch all events from multiple calendars with asyncio.
+
+    Every calendar is fetched in its own task, following its result pages,
+    while a semaphore bounds the number of requests in flight. The events
+    are the same gcsa Event objects built by SimpleGCalendarGetter.
+
+    incremental_sync and batch_requests are not used: every calendar is
+    fetched in full, and its requests already share keep-alive connections.
+
+    Args:
+        general_params (Dict[str, Any]): General params
+        calendar_params (Dict[str, Any]): Calendar params
+
+    Attributes:
+        api_url (str): Base URL of the Calendar API
+        http (AsyncHTTPClient): HTTP client used by the last load_calendars
+        period (Tuple[datetime, datetime]): Period of the last load_calendars
+    """
+
+    api_url: str
+    http: AsyncHTTPClient
+    period: Tuple[datetime, datetime]
+
+    def __init__(
+        self,
+        general_params: Dict[str, Any],
+        calendar_params: Dict[str, Any],
+    ) -> None:
+        super().__init__(general_params, calendar_params)
+        self.api_url = general_params.get("api_url", API_URL)
+        for option in ("incremental_sync", "batch_requests"):
+            if general_params.get(option, False):
+                logger.warning("%s is not used with fetch_engine = asyncio", option)
+
+    def load_calendars(self, period: Tuple[datetime, datetime]) -> None:
+        """Load calendars from Google using the configs passed to the class.
+
+        Args:
+            period (Tuple[datetime, datetime]): (Start datetime, End datetime)
+        """
+        self.period = period
+        expand = self.general_params.get("expand_recurrence", False)
+        list_params = {
+            "timeMin": self.as_datetime(period[0]).isoformat(),
+            "timeMax": self.as_datetime(period[1]).isoformat(),
+            "singleEvents": str(
+                self.general_params.get("single_events", True) and not expand
+            ).lower(),
+        }
+        if self.general_params.get("order_by") and not expand:
+            list_params["orderBy"] = self.general_params["order_by"]
+
+        self.calendars = asyncio.run(self.fetch_calendars(list_params))
+
+    async def fetch_calendars(self, list_params: Dict[str, Any]) -> Dict[str, List[Event]]:
+        """Fetch all the calendars concurrently.
+
+        Args:
+            list_params (Dict[str, Any]): Params of the events list request
+
+        Returns:
+            Dict[str, List[Event]]: Events of each calendar
+        """
+        self.http = AsyncHTTPClient(self.general_params.get("fetch_timeout", 30.0))
+        semaphore = asyncio.Semaphore(self.general_params.get("fetch_concurrency", 64))
+        tokens = {
+            cal_code: self.access_token(params) for cal_code, params in self.calendar_params.items()
+        }
+        try:
+            results = await asyncio.gather(
+                *(
+                    self.fetch_calendar_async(
+                        params.get("calendar", "primary"),
+                        params.get("credentials", DEFAULT_CREDENTIALS),
+                        tokens[cal_code],
+                        {**list_params, "fields": self.partial_fields(params)},
+                        semaphore,
+                    )
+                    for cal_code, params in self.calendar_params.items()
+                )
+            )
+        finally:
+            self.http.close()
+        return dict(zip(self.calendar_params, results))
+
+    async def fetch_calendar_async(
+        self,
+        calendar: str,
+        account: Path,
+        token: str,
+        list_params: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+    ) -> List[Event]:
+        """Fetch all result pages of a calendar.
+
+        Each request waits for the quota of the calendar's account, and
+        throttled requests are sent again after the scheduler's backoff. A
+        request refused with 401, e.g. when the token expired during the
+        fetch, is sent once more with a refreshed token.
+
+        Args:
+            calendar (str): Name or ID of the calendar
+            account (Path): Credentials path of the calendar's account
+            token (str): OAuth access token of the calendar's account
+            list_params (Dict[str, Any]): Params of the events list request
+            semaphore (asyncio.Semaphore): Bounds the requests in flight
+
+        Returns:
+            List[Event]: Events of the calendar
+        """
+        url = f"{self.api_url}/calendars/{quote(calendar, safe='')}/events"
+        headers = {"Authorization": f"Bearer {token}"}
+        items = []
+        page_token = None
+        refreshed = False
+        while True:
+            query = {k: v for k, v in list_params.items() if v is not None}
+            if page_token:
+                query["pageToken"] = page_token
+            attempt = 0
+            while True:
+                await self.scheduler.acquire_async(account)
+                try:
+                    async with semaphore:
+                        response = await self.http.get_json(f"{url}?{urlencode(query)}", headers)
+                    break
+                except HTTPStatusError as error:
+                    if error.status == 401 and not refreshed:
+                        token = await asyncio.to_thread(self.refresh_token, account)
+                        headers = {"Authorization": f"Bearer {token}"}
+                        refreshed = True
+                        continue
+                    if not self.scheduler.should_retry(
+                        account, attempt, error.status, error.body, error.headers.get("retry-after")
+                    ):
+                        raise
+                    attempt += 1
+            items.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        if self.general_params.get("expand_recurrence", False):
+            return self.items_to_events(items, self.period)
+        return [EventSerializer.to_object(item) for item in items]
+
+    def access_token(self, params: Dict[str, Any]) -> str:
+        """OAuth access token of a calendar, authorized through the client pool.
+
+        Args:
+            params (Dict[str, Any]): Params of the calendar
+
+        Returns:
+            str: Access token
+        """
+        client = self.pool.get(
+            params.get("calendar", "primary"), params.get("credentials", DEFAULT_CREDENTIALS)
+        )
+        return client.credentials.token
+
+    def refresh_token(self, account: Path) -> str:
+        """Refresh the OAuth access token of an account, shared with its pooled clients.
+
+        Args:
+            account (Path): Credentials path of the account
+
+        Returns:
+            str: New access token
+        """
+        credentials = self.pool.credentials[account]
+        credentials.refresh(Request())
+        return credentials.token
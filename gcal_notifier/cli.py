@@ -30,6 +30,12 @@ def init_parser() -> argparse.ArgumentParser:
         description="Run reminders with cached events.",
     )
 
+    subparsers.add_parser(
+        "daemon",
+        help="run reminders in a resident process.",
+        description="Run reminders in a resident process, reloading cached events when get saves them.",  # noqa
+    )
+
     parser_print = subparsers.add_parser(
         "print",
         help="print events to the console.",
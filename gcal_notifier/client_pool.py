@@ -0,0 +1,114 @@
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import httplib2
+from gcsa.google_calendar import GoogleCalendar
+from google.auth.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery
+
+from gcal_notifier.scheduler import RequestScheduler, ScheduledHttp
+
+
+class GoogleCalendarPool:
+    """Pool of authorized GoogleCalendar clients, keyed by credentials path.
+
+    Calendars of the same account share one client, so the token is loaded
+    (and refreshed, if needed) only once per account and the requests reuse
+    the same keep-alive connection. The httplib2 transport of a client is not
+    thread-safe, so each thread gets its own client of an account, built on
+    top of the already authorized credentials.
+
+    When a scheduler is given, the requests of the clients go through it,
+    paced by the quota of their account.
+
+    Args:
+        connect (Callable[[str, Path], GoogleCalendar]): Creates an authorized client
+            from (calendar, credentials path)
+        scheduler (Optional[RequestScheduler]): Scheduler of the requests
+        api_url (Optional[str]): Base URL of the Calendar API, if not Google's
+
+    Attributes:
+        connect (Callable[[str, Path], GoogleCalendar]): Creates an authorized client
+        scheduler (Optional[RequestScheduler]): Scheduler of the requests
+        api_url (Optional[str]): Base URL of the Calendar API, if not Google's
+        credentials (Dict[Path, Credentials]): Authorized credentials of each account
+        clients (Dict[Tuple[Path, int], GoogleCalendar]): Clients of each account and thread
+    """
+
+    connect: Callable[[str, Path], GoogleCalendar]
+    scheduler: Optional[RequestScheduler]
+    api_url: Optional[str]
+    credentials: Dict[Path, Credentials]
+    clients: Dict[Tuple[Path, int], GoogleCalendar]
+
+    def __init__(
+        self,
+        connect: Callable[[str, Path], GoogleCalendar],
+        scheduler: Optional[RequestScheduler] = None,
+        api_url: Optional[str] = None,
+    ) -> None:
+        self.connect = connect
+        self.scheduler = scheduler
+        self.api_url = api_url
+        self.credentials = {}
+        self.clients = {}
+        self._locks: Dict[Path, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, calendar: str, credentials: Path) -> GoogleCalendar:
+        """Get the client of an account, connecting on first use.
+
+        Args:
+            calendar (str): Name or ID of the calendar, used as the default calendar
+                of a new client
+            credentials (Path): Path to the credentials file of the account
+
+        Returns:
+            GoogleCalendar: GoogleCalendar client
+        """
+        key = (credentials, threading.get_ident())
+        client = self.clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            account_lock = self._locks.setdefault(credentials, threading.Lock())
+        with account_lock:
+            if credentials not in self.credentials:
+                client = self.connect(calendar, credentials)
+                self.credentials[credentials] = client.credentials
+
+        if self.scheduler is not None or self.api_url is not None:
+            client = self.build_client(calendar, credentials)
+        elif client is None:
+            client = GoogleCalendar(calendar, credentials=self.credentials[credentials])
+        self.clients[key] = client
+        return client
+
+    def build_client(self, calendar: str, credentials: Path) -> GoogleCalendar:
+        """Build a client of an account whose requests go through the scheduler.
+
+        GoogleCalendar always builds a discovery service on its own transport,
+        so the client is created without calling it and gets its service once,
+        built on the scheduled transport. The client returned by connect, which
+        authorizes the account, is then only kept for its credentials.
+
+        Args:
+            calendar (str): Name or ID of the default calendar of the client
+            credentials (Path): Path to the credentials file of the account
+
+        Returns:
+            GoogleCalendar: GoogleCalendar client
+        """
+        http = AuthorizedHttp(self.credentials[credentials], http=httplib2.Http())
+        if self.scheduler is not None:
+            http = ScheduledHttp(http, self.scheduler, credentials)
+        client_options = {"api_endpoint": f"{self.api_url}/"} if self.api_url else None
+
+        client = GoogleCalendar.__new__(GoogleCalendar)
+        client.default_calendar = calendar
+        client.credentials = self.credentials[credentials]
+        client.service = discovery.build("calendar", "v3", http=http, client_options=client_options)
+        return client
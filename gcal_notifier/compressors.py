@@ -0,0 +1,190 @@
+import lzma
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class Compressor(ABC):
+    """Compression of the cache files.
+
+    Compressed files are recognized by the magic bytes of their codec, so
+    loading needs no setting, and files saved without compression, or
+    before it was set, keep loading as they are.
+
+    Attributes:
+        name (str): Name of the codec, as set in cache_compression
+        magic (bytes): Bytes every compressed file starts with
+    """
+
+    name: str = ""
+    magic: bytes = b""
+
+    @abstractmethod
+    def compressobj(self) -> Any:
+        """Incremental compressor, with compress and flush methods."""
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress the content of a file.
+
+        Args:
+            data (bytes): Content of the file
+
+        Returns:
+            bytes: Compressed content, the same as written incrementally
+        """
+        compressobj = self.compressobj()
+        return compressobj.compress(data) + compressobj.flush()
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress the content of a file.
+
+        Args:
+            data (bytes): Compressed content
+
+        Returns:
+            bytes: Content of the file
+        """
+
+    @abstractmethod
+    def iter_decompress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Decompress the content of a file incrementally.
+
+        Args:
+            chunks (Iterable[bytes]): Compressed content, in chunks
+
+        Yields:
+            bytes: Decompressed content, in chunks, some of them maybe empty
+        """
+
+    def matches(self, data: bytes) -> bool:
+        """If the content of a file was compressed with this codec.
+
+        Args:
+            data (bytes): Content of the file, or at least its first bytes
+
+        Returns:
+            bool: If the content starts with the magic bytes
+        """
+        return data.startswith(self.magic)
+
+
+class ZlibCompressor(Compressor):
+    """zlib, fast to decode, for files read often."""
+
+    name = "zlib"
+    magic = b"\x78"
+
+    def compressobj(self) -> Any:
+        return zlib.compressobj(6)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+    def iter_decompress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        decompressobj = zlib.decompressobj()
+        for chunk in chunks:
+            yield decompressobj.decompress(chunk)
+        yield decompressobj.flush()
+
+    def matches(self, data: bytes) -> bool:
+        # The second byte of a zlib header makes the first two a multiple of 31
+        return len(data) > 1 and data[0] == 0x78 and int.from_bytes(data[:2], "big") % 31 == 0
+
+
+class LZMACompressor(Compressor):
+    """xz, the smallest files but the slowest to save and load."""
+
+    name = "lzma"
+    magic = b"\xfd7zXZ\x00"
+
+    def compressobj(self) -> Any:
+        return lzma.LZMACompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return lzma.decompress(data)
+
+    def iter_decompress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        decompressor = lzma.LZMADecompressor()
+        for chunk in chunks:
+            yield decompressor.decompress(chunk)
+
+
+class ZstdCompressor(Compressor):
+    """Zstandard, about the size of zlib and faster to decode. Needs zstandard."""
+
+    name = "zstd"
+    magic = b"\x28\xb5\x2f\xfd"
+
+    def compressobj(self) -> Any:
+        return zstandard.ZstdCompressor(level=3).compressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    def iter_decompress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        decompressobj = zstandard.ZstdDecompressor().decompressobj()
+        for chunk in chunks:
+            yield decompressobj.decompress(chunk)
+
+
+COMPRESSORS = {
+    compressor.name: compressor for compressor in (ZlibCompressor, LZMACompressor, ZstdCompressor)
+}
+
+
+def get_compressor(name: str = "none") -> Optional[Compressor]:
+    """Get the compressor of a cache_compression setting.
+
+    Args:
+        name (str): Name of the codec, or none
+
+    Returns:
+        Optional[Compressor]: Compressor, or None for no compression
+
+    Raises:
+        ValueError: Unknown codec
+        ImportError: zstd without the zstandard package
+    """
+    if not name or name == "none":
+        return None
+    if name not in COMPRESSORS:
+        raise ValueError(
+            f"Unknown cache_compression {name!r}, use none or one of {', '.join(COMPRESSORS)}"
+        )
+    if name == "zstd" and zstandard is None:
+        raise ImportError("cache_compression = zstd needs the zstandard package")
+    return COMPRESSORS[name]()
+
+
+def detect_compressor(data: bytes) -> Optional[Compressor]:
+    """Get the compressor of a cache file from its magic bytes.
+
+    Args:
+        data (bytes): Content of the file, or at least its first bytes
+
+    Returns:
+        Optional[Compressor]: Compressor, or None for a file saved without compression
+    """
+    for compressor in COMPRESSORS.values():
+        if compressor().matches(data):
+            return get_compressor(compressor.name)
+    return None
+
+
+def decompress(data: bytes) -> bytes:
+    """Decompress the content of a cache file, if it is compressed.
+
+    Args:
+        data (bytes): Content of the file
+
+    Returns:
+        bytes: Decompressed content
+    """
+    compressor = detect_compressor(data)
+    return compressor.decompress(data) if compressor else data
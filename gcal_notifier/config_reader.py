@@ -17,6 +17,18 @@ def parse_int_list(input: str) -> List[int]:
     return list(int(value) for value in input.split(","))
 
 
+def parse_str_list(input: str) -> List[str]:
+    """Parse a list of strings from the config file.
+
+    Args:
+        input (str): Input list
+
+    Returns:
+        List[str]: List of strings
+    """
+    return [value.strip() for value in input.split(",") if value.strip()]
+
+
 def parse_path(input: str) -> Path:
     """Parse a string path from the config file.
 
@@ -54,6 +66,23 @@ def merge_general(config: ConfigParser) -> Dict[str, Any]:
         "order_by": config["GENERAL"].get("order_by"),
         "notification_sound": config["GENERAL"].getboolean("notification_sound"),
         "notification_sound_path": config["GENERAL"].getpath("notification_sound_path"),
+        "fetch_workers": config["GENERAL"].getint("fetch_workers"),
+        "incremental_sync": config["GENERAL"].getboolean("incremental_sync"),
+        "fetch_engine": config["GENERAL"].get("fetch_engine"),
+        "fetch_concurrency": config["GENERAL"].getint("fetch_concurrency"),
+        "fetch_timeout": config["GENERAL"].getfloat("fetch_timeout"),
+        "stream_events": config["GENERAL"].getboolean("stream_events"),
+        "fields": config["GENERAL"].getstrlist("fields"),
+        "expand_recurrence": config["GENERAL"].getboolean("expand_recurrence"),
+        "batch_requests": config["GENERAL"].getboolean("batch_requests"),
+        "rate_limit": config["GENERAL"].getfloat("rate_limit"),
+        "max_retries": config["GENERAL"].getint("max_retries"),
+        "cache_format": config["GENERAL"].get("cache_format"),
+        "cache_backend": config["GENERAL"].get("cache_backend"),
+        "extra_fields": config["GENERAL"].getstrlist("extra_fields"),
+        "fetch_horizon": config["GENERAL"].getint("fetch_horizon"),
+        "cache_compression": config["GENERAL"].get("cache_compression"),
+        "daemon_poll_interval": config["GENERAL"].getfloat("daemon_poll_interval"),
     }
     return {
         **GENERAL_PARAMS,
@@ -82,6 +111,7 @@ def merge_calendars(config: ConfigParser) -> Dict[str, Any]:
             "default_reminders": cal.getlist,
             "force_default_reminders": cal.getboolean,
             "default_color": cal.get,
+            "fields": cal.getstrlist,
         }
 
         calendar_params[calendar] = {k: func_types[k](k) for k in cal}
@@ -100,7 +130,9 @@ def init_config(
         Tuple[Dict[str, Any], Dict[str, Any]]: (General, Calendar)
     """
 
-    config = ConfigParser(converters={"list": parse_int_list, "path": parse_path})
+    config = ConfigParser(
+        converters={"list": parse_int_list, "strlist": parse_str_list, "path": parse_path}
+    )
     config.read(config_path)
     validate_config(config)
     general_params = merge_general(config)
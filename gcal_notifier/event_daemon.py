@@ -0,0 +1,170 @@
+import heapq
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from gcal_notifier.event_reminder import SimpleGCalendarNotifier
+from gcal_notifier.serializers import CachedEvent, event_timestamp
+
+CacheSignature = Tuple[Tuple[int, int], ...]
+
+
+class ReminderDaemon:
+    """Notifier that keeps running, for gcal_notifier daemon.
+
+    The events are loaded once and the fire time of every reminder still to
+    come goes in a heap, so the daemon sleeps until the first one and fires
+    it on its second, instead of notify scanning the cache every minute.
+    The cache files are checked at least every poll_interval seconds, and
+    when get changes them, or the day changes, the events are loaded again
+    and the heap is rebuilt, without firing again what was already fired.
+
+    Args:
+        general_params (Dict[str, Any]): General params
+        calendar_params (Dict[str, Any]): Calendar params
+        load_events (Callable[[datetime], List[CachedEvent]]): Loads the
+            events that end after a datetime
+        cache_files (Iterable[Path]): Files whose changes re-arm the heap
+        poll_interval (float): Max seconds between two checks of the cache files
+
+    Attributes:
+        notifier (SimpleGCalendarNotifier): Notifier that runs the commands
+        heap (List[Tuple[float, int, CachedEvent]]): (Fire epoch, order, event)
+            of the reminders to fire
+        fired_until (float): Epoch up to which reminders were fired
+        day (Optional[date]): Day the events were loaded
+        signature (CacheSignature): mtime and size of the cache files when loaded
+        stopped (threading.Event): Set to make run return
+    """
+
+    notifier: SimpleGCalendarNotifier
+    heap: List[Tuple[float, int, CachedEvent]]
+    fired_until: float
+    day: Optional[date]
+    signature: CacheSignature
+    stopped: threading.Event
+
+    def __init__(
+        self,
+        general_params: Dict[str, Any],
+        calendar_params: Dict[str, Any],
+        load_events: Callable[[datetime], List[CachedEvent]],
+        cache_files: Iterable[Path],
+        poll_interval: float = 30.0,
+    ) -> None:
+
+        self.notifier = SimpleGCalendarNotifier([], general_params, calendar_params)
+        self.load_events = load_events
+        self.cache_files = list(cache_files)
+        self.poll_interval = poll_interval
+        self.heap = []
+        self.fired_until = 0.0
+        self.day = None
+        self.signature = ()
+        self.stopped = threading.Event()
+
+    def cache_signature(self) -> CacheSignature:
+        """mtime and size of the cache files, (0, 0) for a missing one.
+
+        Returns:
+            CacheSignature: Signature of every cache file
+        """
+        signature = []
+        for path in self.cache_files:
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((0, 0))
+        return tuple(signature)
+
+    def arm(self, now: datetime) -> None:
+        """Load the events and rebuild the heap of the reminders to fire.
+
+        The first arm starts from now. Later ones keep every reminder after
+        fired_until, so the ones that came due since the last fire_due, e.g.
+        the one that woke the daemon at midnight, still fire, from the
+        events as they are now. A cache that is missing, e.g. before the
+        first get, leaves the heap empty until it is saved.
+
+        Args:
+            now (datetime): Current time, aware
+        """
+        if not self.fired_until:
+            self.fired_until = now.timestamp()
+        self.day = now.date()
+        self.signature = self.cache_signature()
+        try:
+            self.notifier.events = self.load_events(
+                datetime.fromtimestamp(self.fired_until, now.tzinfo)
+            )
+        except OSError:
+            self.notifier.events = []
+
+        self.heap = []
+        for num, event in enumerate(self.notifier.events):
+            start = event_timestamp(event, "start")
+            for reminder in event.reminders:
+                fire = start - reminder * 60
+                if fire > self.fired_until:
+                    self.heap.append((fire, num, event))
+        heapq.heapify(self.heap)
+
+    def needs_arm(self, now: datetime) -> bool:
+        """If the day or the cache files changed since the events were loaded.
+
+        Args:
+            now (datetime): Current time, aware
+
+        Returns:
+            bool: If the heap has to be rebuilt
+        """
+        return now.date() != self.day or self.cache_signature() != self.signature
+
+    def fire_due(self, now: float) -> None:
+        """Notify the reminders whose time came.
+
+        Reminders more than a minute late, e.g. after the computer slept,
+        are dropped, the same as notify would have missed them.
+
+        Args:
+            now (float): Current epoch
+        """
+        while self.heap and self.heap[0][0] <= now:
+            fire, _, event = heapq.heappop(self.heap)
+            if now < fire + 60:
+                self.notifier.notify(event)
+        self.fired_until = max(self.fired_until, now)
+
+    def timeout(self, now: float) -> float:
+        """Seconds to sleep until the next reminder or cache check.
+
+        Args:
+            now (float): Current epoch
+
+        Returns:
+            float: Seconds to sleep
+        """
+        if self.heap:
+            return max(min(self.heap[0][0] - now, self.poll_interval), 0.0)
+        return self.poll_interval
+
+    def tick(self, now: datetime) -> float:
+        """Re-arm if needed, then fire the reminders that came due.
+
+        Args:
+            now (datetime): Current time, aware
+
+        Returns:
+            float: Seconds to sleep before the next tick
+        """
+        if self.needs_arm(now):
+            self.arm(now)
+        self.fire_due(now.timestamp())
+        return self.timeout(now.timestamp())
+
+    def run(self) -> None:
+        """Fire the reminders until stopped is set."""
+        while not self.stopped.wait(self.tick(datetime.now().astimezone())):
+            pass
@@ -1,15 +1,55 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
-from datetime import datetime
+from copy import deepcopy
+from datetime import date, datetime
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from gcsa.event import Event
 from gcsa.google_calendar import GoogleCalendar
+from gcsa.serializers.event_serializer import EventSerializer
 from google.auth.exceptions import RefreshError
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
 
-from gcal_notifier.globals import CONFIG
+from gcal_notifier.client_pool import GoogleCalendarPool
+from gcal_notifier.event_saver import date_to_datetime, write_atomic
+from gcal_notifier.globals import CACHE, CONFIG
+from gcal_notifier.recurrence import EXPANSION_FIELDS, expand_items
+from gcal_notifier.scheduler import RequestScheduler
 from gcal_notifier.utils import run_notify
 
+DEFAULT_CREDENTIALS = CONFIG / "default" / "credentials.json"
+
+BATCH_URL = "https://www.googleapis.com/batch/calendar/v3"
+
+BATCH_SIZE = 50
+
+# Event attributes whose raw field is not their camelCase name
+API_FIELDS = {
+    "event_id": "id",
+    "timezone": "start",
+    "default_reminders": "reminders",
+    "conference_solution": "conferenceData",
+}
+
+
+def api_field(field: str) -> str:
+    """Raw event field of an Event attribute or raw field, as named by the API.
+
+    Args:
+        field (str): Event attribute (e.g. color_id) or raw field (e.g. htmlLink)
+
+    Returns:
+        str: Raw field (e.g. colorId)
+    """
+    if field in API_FIELDS:
+        return API_FIELDS[field]
+    first, *others = field.lstrip("_").split("_")
+    return first + "".join(other.capitalize() for other in others)
+
 
 class SimpleGCalendarGetter:
     """Connector to fetch all events from multiple calendars.
@@ -24,12 +64,16 @@ class SimpleGCalendarGetter:
         calendar_params (Dict[str, Any]): Calendar params
         calendars (Dict[str, GoogleCalendar]): Calendar connections
         events (List[Dict[str, Event]]): List of all events
+        pool (GoogleCalendarPool): Clients shared by calendars of the same account
+        scheduler (RequestScheduler): Paces and retries the requests of each account
     """
 
     config: ConfigParser
     general_params: Dict[str, Any]
     calendar_params: Dict[str, Any]
     calendars: Dict[str, GoogleCalendar]
+    pool: GoogleCalendarPool
+    scheduler: RequestScheduler
     events: List[Dict[str, Event]]
 
     def __init__(
@@ -40,6 +84,12 @@ class SimpleGCalendarGetter:
 
         self.general_params = general_params
         self.calendar_params = calendar_params
+        self.scheduler = RequestScheduler(
+            general_params.get("rate_limit", 600), general_params.get("max_retries", 5)
+        )
+        self.pool = GoogleCalendarPool(
+            self.make_conn, self.scheduler, general_params.get("api_url")
+        )
 
     def load_calendars(self, period: Tuple[datetime, datetime]) -> None:
         """Load calendars from Google using the configs passed to the class.
@@ -53,10 +103,404 @@ class SimpleGCalendarGetter:
             k: v for k, v in self.general_params.items() if k in ["order_by", "single_events"]
         }
         event_params["time_min"], event_params["time_max"] = period
+        if self.general_params.get("expand_recurrence", False):
+            event_params.update(single_events=False, order_by=None)
 
+        if self.general_params.get("batch_requests", False) and not self.general_params.get(
+            "incremental_sync", False
+        ):
+            self.calendars = self.fetch_batched(event_params)
+            return
+
+        workers = self.general_params.get("fetch_workers", 1)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    cal_code: executor.submit(self.fetch_calendar, cal_code, params, event_params)
+                    for cal_code, params in self.calendar_params.items()
+                }
+            self.calendars = {cal_code: future.result() for cal_code, future in futures.items()}
+        else:
+            for cal_code, params in self.calendar_params.items():
+                self.calendars[cal_code] = self.open_calendar(cal_code, params, event_params)
+
+    def open_calendar(
+        self, cal_code: str, params: Dict[str, Any], event_params: Dict[str, Any]
+    ) -> Iterable[Event]:
+        """Connect to a calendar and return its events.
+
+        Args:
+            cal_code (str): Code of the calendar in the config file
+            params (Dict[str, Any]): Params of the calendar
+            event_params (Dict[str, Any]): Params passed to get_events
+
+        Returns:
+            Iterable[Event]: Events of the calendar
+        """
+        calendar = params.get("calendar", "primary")
+        conn = self.pool.get(calendar, params.get("credentials", DEFAULT_CREDENTIALS))
+        event_params = {**event_params, "fields": self.partial_fields(params)}
+        if self.general_params.get("incremental_sync", False):
+            return self.sync_calendar(conn, cal_code, calendar, event_params)
+        if self.general_params.get("expand_recurrence", False):
+            period = (event_params["time_min"], event_params["time_max"])
+            time_min, time_max = map(date_to_datetime, period)
+            items, _ = self.list_items(
+                conn,
+                calendarId=calendar,
+                timeMin=time_min.isoformat(),
+                timeMax=time_max.isoformat(),
+                singleEvents=False,
+                fields=event_params["fields"],
+            )
+            return self.items_to_events(items, period)
+        return conn.get_events(calendar_id=calendar, **event_params)
+
+    def fetch_calendar(
+        self, cal_code: str, params: Dict[str, Any], event_params: Dict[str, Any]
+    ) -> List[Event]:
+        """Connect to a calendar and fetch all of its events eagerly.
+
+        Used by the concurrent mode of load_calendars, so the HTTP round trips
+        happen inside the worker instead of when the events are iterated.
+
+        Args:
+            cal_code (str): Code of the calendar in the config file
+            params (Dict[str, Any]): Params of the calendar
+            event_params (Dict[str, Any]): Params passed to get_events
+
+        Returns:
+            List[Event]: Events of the calendar
+        """
+        return list(self.open_calendar(cal_code, params, event_params))
+
+    def fetch_batched(self, event_params: Dict[str, Any]) -> Dict[str, List[Event]]:
+        """Fetch all calendars with batch requests, one account at a time.
+
+        The first pages of the calendars sharing a credential are requested in
+        batches of up to BATCH_SIZE, then the next pages of the calendars that
+        have more results, until none is left.
+
+        Args:
+            event_params (Dict[str, Any]): Params passed to get_events
+
+        Returns:
+            Dict[str, List[Event]]: Events of each calendar
+        """
+        period = (event_params["time_min"], event_params["time_max"])
+        time_min, time_max = map(date_to_datetime, period)
+
+        accounts: Dict[Path, List[str]] = {}
         for cal_code, params in self.calendar_params.items():
-            conn_params = {k: params[k] for k in params if k in ["calendar", "credentials"]}
-            self.calendars[cal_code] = self.make_conn(**conn_params).get_events(**event_params)
+            accounts.setdefault(params.get("credentials", DEFAULT_CREDENTIALS), []).append(cal_code)
+
+        items: Dict[str, List[Dict[str, Any]]] = {cal_code: [] for cal_code in self.calendar_params}
+        for credentials, cal_codes in accounts.items():
+            conn = self.pool.get(
+                self.calendar_params[cal_codes[0]].get("calendar", "primary"), credentials
+            )
+            list_params = {
+                cal_code: {
+                    "calendarId": self.calendar_params[cal_code].get("calendar", "primary"),
+                    "timeMin": time_min.isoformat(),
+                    "timeMax": time_max.isoformat(),
+                    "singleEvents": event_params["single_events"],
+                    "orderBy": event_params["order_by"],
+                    "fields": self.partial_fields(self.calendar_params[cal_code]),
+                }
+                for cal_code in cal_codes
+            }
+
+            pending: Dict[str, Optional[str]] = dict.fromkeys(cal_codes)
+            while pending:
+                page_requests = list(pending.items())
+                pending = {}
+                for start in range(0, len(page_requests), BATCH_SIZE):
+                    responses = self.execute_batch(
+                        conn,
+                        credentials,
+                        {
+                            cal_code: {**list_params[cal_code], "pageToken": page_token}
+                            for cal_code, page_token in page_requests[start : start + BATCH_SIZE]
+                        },
+                    )
+                    for cal_code, response in responses.items():
+                        items[cal_code].extend(response.get("items", []))
+                        if response.get("nextPageToken"):
+                            pending[cal_code] = response["nextPageToken"]
+
+        return {cal_code: self.items_to_events(items[cal_code], period) for cal_code in items}
+
+    def execute_batch(
+        self, conn: GoogleCalendar, account: Path, requests: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Send events list requests in a single batch request.
+
+        Calls of the batch that were throttled are sent again in a new batch,
+        once the scheduler allows it.
+
+        Args:
+            conn (GoogleCalendar): Connection to the account
+            account (Path): Credentials path of the account
+            requests (Dict[str, Dict[str, Any]]): Params of each list request, by request id
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Response of each list request, by request id
+
+        Raises:
+            HttpError: One of the list requests failed
+        """
+        state: Dict[str, Any] = {"attempt": 0, "responses": {}}
+        collect = partial(self.collect_response, account, state)
+        while requests:
+            state.update(requests=requests, throttled={}, errors=[])
+            batch = BatchHttpRequest(
+                callback=collect, batch_uri=self.general_params.get("batch_url", BATCH_URL)
+            )
+            for request_id, list_params in requests.items():
+                batch.add(conn.service.events().list(**list_params), request_id=request_id)
+            batch.execute()
+
+            if state["errors"]:
+                raise state["errors"][0]
+            requests = state["throttled"]
+            state["attempt"] += 1
+        return state["responses"]
+
+    def collect_response(
+        self,
+        account: Path,
+        state: Dict[str, Any],
+        request_id: str,
+        response: Dict[str, Any],
+        exception: Optional[Exception],
+    ) -> None:
+        """Callback of a batch request, sorting the answer of one list request.
+
+        Args:
+            account (Path): Credentials path of the account
+            state (Dict[str, Any]): Batch being sent: its requests, the attempt, and
+                the responses, throttled requests and errors collected so far
+            request_id (str): Id of the list request
+            response (Dict[str, Any]): Response, if it succeeded
+            exception (Optional[Exception]): Error, if it failed
+        """
+        if exception is None:
+            state["responses"][request_id] = response
+        elif isinstance(exception, HttpError) and self.scheduler.should_retry(
+            account,
+            state["attempt"],
+            exception.resp.status,
+            exception.content,
+            exception.resp.get("retry-after"),
+        ):
+            state["throttled"][request_id] = state["requests"][request_id]
+        else:
+            state["errors"].append(exception)
+
+    def sync_calendar(
+        self,
+        conn: GoogleCalendar,
+        cal_code: str,
+        calendar: str,
+        event_params: Dict[str, Any],
+    ) -> List[Event]:
+        """Fetch the events of a calendar incrementally with sync tokens.
+
+        The raw events of the calendar and its nextSyncToken are kept under
+        CACHE / "sync", so later runs only download what changed since then.
+        A full resync happens when there is no usable state, when the period
+        is not covered by the stored one or when Google expired the token.
+
+        Args:
+            conn (GoogleCalendar): Connection to the calendar
+            cal_code (str): Code of the calendar in the config file
+            calendar (str): Name or ID of the calendar
+            event_params (Dict[str, Any]): Params passed to get_events
+
+        Returns:
+            List[Event]: Events of the calendar inside the period, sorted by start
+        """
+        state_path = CACHE / "sync" / f"{cal_code}.json"
+        period = (event_params["time_min"], event_params["time_max"])
+        list_params = {
+            "calendarId": calendar,
+            "singleEvents": event_params["single_events"],
+            "fields": event_params.get("fields"),
+        }
+
+        state = self.load_sync_state(state_path)
+        if not self.is_sync_state_valid(state, list_params, period):
+            state = None
+        else:
+            try:
+                changes, state["sync_token"] = self.list_items(
+                    conn, syncToken=state["sync_token"], **list_params
+                )
+            except HttpError as error:
+                if error.resp.status != 410:
+                    raise
+                state = None
+            else:
+                for item in changes:
+                    if self.is_deleted(item):
+                        state["items"].pop(item["id"], None)
+                    else:
+                        state["items"][item["id"]] = item
+
+        if state is None:
+            time_min, time_max = map(date_to_datetime, period)
+            items, sync_token = self.list_items(
+                conn, timeMin=time_min.isoformat(), timeMax=time_max.isoformat(), **list_params
+            )
+            state = {
+                **list_params,
+                "time_min": period[0].isoformat(),
+                "time_max": period[1].isoformat(),
+                "sync_token": sync_token,
+                "items": {item["id"]: item for item in items if not self.is_deleted(item)},
+            }
+
+        self.save_sync_state(state, state_path)
+        return self.items_to_events(state["items"].values(), period)
+
+    def items_to_events(
+        self, items: Iterable[Dict[str, Any]], period: Tuple[date, date]
+    ) -> List[Event]:
+        """Turn raw events into the events of a period, sorted by start.
+
+        Recurring events are expanded locally when expand_recurrence is set.
+
+        Args:
+            items (Iterable[Dict[str, Any]]): Raw events
+            period (Tuple[date, date]): (Start date, End date)
+
+        Returns:
+            List[Event]: Events that overlap the period, sorted by start
+        """
+        if self.general_params.get("expand_recurrence", False):
+            events = expand_items(items, period)
+        else:
+            events = [
+                EventSerializer.to_object(deepcopy(item))
+                for item in items
+                if item.get("status") != "cancelled"
+            ]
+        events = self.select_period(events, period)
+        events.sort(key=lambda event: self.as_datetime(event.start))
+        return events
+
+    @staticmethod
+    def is_deleted(item: Dict[str, Any]) -> bool:
+        """Check if a raw event was deleted.
+
+        Cancelled exceptions of recurring events are not deleted, since they
+        remove an occurrence of the recurring event.
+
+        Args:
+            item (Dict[str, Any]): Raw event
+
+        Returns:
+            bool: If the event was deleted
+        """
+        return item.get("status") == "cancelled" and not item.get("recurringEventId")
+
+    def partial_fields(self, params: Dict[str, Any]) -> Optional[str]:
+        """Partial response selector of the events list request of a calendar.
+
+        Only the configured event fields (by default, the ones used by the
+        notifier and the printer) and the extra_fields to cache are
+        requested, plus what is needed for pagination and sync.
+
+        Args:
+            params (Dict[str, Any]): Params of the calendar
+
+        Returns:
+            Optional[str]: Value of the fields param, None to get full events
+        """
+        fields = params.get("fields", self.general_params.get("fields"))
+        if not fields or "*" in fields:
+            return None
+        extra_fields = self.general_params.get("extra_fields", [])
+        fields = [*fields, *(api_field(field) for field in extra_fields if field != "other")]
+        if self.general_params.get("expand_recurrence", False):
+            fields = [*fields, *EXPANSION_FIELDS]
+        items = ",".join(dict.fromkeys(["id", "status", *fields]))
+        return f"nextPageToken,nextSyncToken,items({items})"
+
+    @staticmethod
+    def list_items(conn: GoogleCalendar, **list_params: Any) -> Tuple[List[Dict[str, Any]], str]:
+        """Request all pages of an events list and collect the raw items.
+
+        Args:
+            conn (GoogleCalendar): Connection to the calendar
+            **list_params (Any): Params of the events list request
+
+        Returns:
+            Tuple[List[Dict[str, Any]], str]: (Raw events, nextSyncToken)
+        """
+        items = []
+        page_token = None
+        while True:
+            response = conn.service.events().list(pageToken=page_token, **list_params).execute()
+            items.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return items, response.get("nextSyncToken")
+
+    @staticmethod
+    def is_sync_state_valid(
+        state: Optional[Dict[str, Any]],
+        list_params: Dict[str, Any],
+        period: Tuple[date, date],
+    ) -> bool:
+        """Check if a stored sync state can be updated incrementally.
+
+        Args:
+            state (Optional[Dict[str, Any]]): Stored sync state
+            list_params (Dict[str, Any]): Params of the events list request
+            period (Tuple[date, date]): (Start date, End date)
+
+        Returns:
+            bool: If the state matches the request and covers the period
+        """
+        if not state or not state.get("sync_token"):
+            return False
+        if any(state.get(k) != v for k, v in list_params.items()):
+            return False
+        return (
+            date.fromisoformat(state["time_min"]) <= period[0]
+            and date.fromisoformat(state["time_max"]) >= period[1]
+        )
+
+    @staticmethod
+    def load_sync_state(path: Path) -> Optional[Dict[str, Any]]:
+        """Load the sync state of a calendar.
+
+        Args:
+            path (Path): Path to the sync state file
+
+        Returns:
+            Optional[Dict[str, Any]]: Sync state, None if there is none
+        """
+        try:
+            with open(path) as json_file:
+                return json.load(json_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def save_sync_state(state: Dict[str, Any], path: Path) -> None:
+        """Save the sync state of a calendar.
+
+        The file is replaced atomically, so a get that is interrupted leaves
+        the previous state, never a partial one.
+
+        Args:
+            state (Dict[str, Any]): Sync state
+            path (Path): Path to the sync state file
+        """
+        write_atomic(path, json.dumps(state, ensure_ascii=False).encode(), hash_file=False)
 
     def set_reminders(self, event: Event) -> None:
         """Set reminders to event.
@@ -80,17 +524,75 @@ class SimpleGCalendarGetter:
     def load_events(self) -> None:
         """Load event from fetched calendar."""
         self.events = []
-        for cal_code, calendar in self.calendars.items():
-            for event in calendar:
-                event.cal_code = cal_code
-                event.calendar = self.calendar_params[cal_code].get("name", "")
-                self.set_reminders(event)
-                self.events.append(event)
+        for stream in self.stream_events():
+            self.events.extend(stream)
+
+    def stream_events(self) -> List[Iterator[Event]]:
+        """Lazily prepare the events of each fetched calendar.
+
+        The events of a calendar are only requested (page by page) when its
+        stream is consumed, unless the calendar was already fetched eagerly.
+
+        Returns:
+            List[Iterator[Event]]: One stream of events per calendar
+        """
+        return [
+            self.prepare_events(cal_code, calendar) for cal_code, calendar in self.calendars.items()
+        ]
+
+    def prepare_events(self, cal_code: str, calendar: Iterable[Event]) -> Iterator[Event]:
+        """Set the calendar info and reminders of the events of a calendar.
+
+        Args:
+            cal_code (str): Code of the calendar in the config file
+            calendar (Iterable[Event]): Events of the calendar
+
+        Yields:
+            Event: Prepared event
+        """
+        for event in calendar:
+            event.cal_code = cal_code
+            event.calendar = self.calendar_params[cal_code].get("name", "")
+            self.set_reminders(event)
+            yield event
+
+    @classmethod
+    def select_period(cls, events: Iterable[Event], period: Tuple[date, date]) -> List[Event]:
+        """Select the events that overlap a period.
+
+        Mirrors the timeMin/timeMax semantics of the Calendar API, so a wide
+        fetch can be narrowed down locally instead of fetched again.
+
+        Args:
+            events (Iterable[Event]): Events
+            period (Tuple[date, date]): (Start date, End date)
+
+        Returns:
+            List[Event]: Events that end after the start and start before the end
+        """
+        time_min, time_max = map(date_to_datetime, period)
+        return [
+            event
+            for event in events
+            if cls.as_datetime(event.end) > time_min and cls.as_datetime(event.start) < time_max
+        ]
+
+    @staticmethod
+    def as_datetime(value: Any) -> datetime:
+        """Event start or end as datetime, all-day dates starting at midnight.
+
+        Args:
+            value (Any): Date or datetime
+
+        Returns:
+            datetime: Datetime object
+        """
+        return value if isinstance(value, datetime) else date_to_datetime(value)
 
     @staticmethod
     def make_conn(
         calendar: str = "primary",
-        credentials: Path = CONFIG / "default" / "credentials.json",
+        credentials: Path = DEFAULT_CREDENTIALS,
     ) -> GoogleCalendar:
         """Wrapper to connect to GoogleCalendar.
 
@@ -102,7 +604,7 @@ class SimpleGCalendarGetter:
             GoogleCalendar: GoogleCalendar client
         """
         try:
-            return GoogleCalendar(calendar=calendar, credentials_path=credentials)
+            return GoogleCalendar(calendar, credentials_path=credentials)
         except RefreshError:
             (credentials.parent / "token.pickle").unlink()
             run_notify(
@@ -1,53 +1,352 @@
 import json
-from datetime import datetime
+import mmap
+import os
+import struct
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from functools import partial
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from gcal_notifier.compressors import decompress, detect_compressor
+from gcal_notifier.event_saver import (
+    INDEX_COUNTS,
+    INDEX_ENTRY,
+    INDEX_MAGIC,
+    SPAN_ENTRY,
+    hash_path,
+    index_path,
+)
+from gcal_notifier.event_shards import ShardedEventCache
+from gcal_notifier.event_store import SQLiteEventStore
 from gcal_notifier.globals import CACHE
+from gcal_notifier.serializers import (
+    CachedEvent,
+    EventTable,
+    IndexColumn,
+    LazyEvent,
+    TableSerializer,
+    detect_serializer,
+    event_timestamp,
+)
+
+CHUNK_SIZE = 64 * 1024
 
 
 def load_events_file(
     path: Path = CACHE / "events_notify.json",
 ) -> List[Dict[str, Any]]:
-    """Load cached events file.
+    """Load cached events file, decompressed if needed.
+
+    Only the json cache format is read, as the raw decoded file, with its
+    datetimes as strings. load_saved_events reads every format.
 
     Args:
         path (Path): path to the events file
 
     Returns:
         List[Dict[str, Any]]: List of events as dictionaries
+
+    Raises:
+        ValueError: File in another cache format
     """
 
-    with open(path) as json_file:
-        json_events = json.load(json_file)
+    data = decompress(path.read_bytes())
+    serializer = detect_serializer(data)
+    if serializer.name != "json":
+        raise ValueError(f"{path} is in the {serializer.name} format, use load_saved_events")
+    json_events = json.loads(data)
 
     return json_events
 
 
-def str_to_datetime(date_str: str) -> datetime:
-    """String to datetime.
+def load_saved_events(
+    path: Path = CACHE / "events_notify.json",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[CachedEvent]:
+    """Load events file and transforma datetime strings into datetime objects.
+
+    The format of the file is read from its header, see serializers, and
+    compressed files are decompressed first, see compressors.
+
+    With a start or an end, only the events that overlap that window are
+    loaded. The window is binary-searched in the index of the file, when
+    it has an up to date one, and the events are only decoded when one of
+    their fields is read, see LazyEvent. Otherwise the file is read up to
+    the end of the window, see iter_saved_events.
 
     Args:
-        date_str (str): date_str
+        path (Path): path to the events file
+        start (Optional[datetime]): Only events that end after it
+        end (Optional[datetime]): Only events that start before it
 
     Returns:
-        datetime: Datetime object
+        List[CachedEvent]: List of events
     """
-    return datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S%z")
 
+    if start is None and end is None:
+        data = decompress(path.read_bytes())
+        return list(map(CachedEvent.from_dict, detect_serializer(data).loads(data)))
 
-def load_saved_events(
+    time_min = start.timestamp() if start else float("-inf")
+    time_max = end.timestamp() if end else float("inf")
+    events = load_window(path, time_min, time_max)
+    if events is not None:
+        return events
+
+    return list(iter_saved_events(path, start, end))
+
+
+def read_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Read the content of a cache file in chunks, decompressed if needed.
+
+    Args:
+        path (Path): path to the events file
+        chunk_size (int): Number of bytes read at a time
+
+    Yields:
+        bytes: Content of the file, in chunks
+    """
+    with open(path, "rb") as cache_file:
+        first = cache_file.read(chunk_size)
+        chunks = chain([first], iter(partial(cache_file.read, chunk_size), b""))
+        compressor = detect_compressor(first)
+        yield from compressor.iter_decompress(chunks) if compressor else chunks
+
+
+def iter_saved_events(
     path: Path = CACHE / "events_notify.json",
-) -> List[Dict[str, Any]]:
-    """Load events file and transforma datetime strings into datetime objects.
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[CachedEvent]:
+    """Load the events of a cache file one at a time, as the file is read.
+
+    The JSON formats are decoded as the file is read, and reading stops at
+    the first event that starts after the end, so the time to the first
+    event and the memory used do not depend on the size of the file.
+
+    Args:
+        path (Path): path to the events file
+        start (Optional[datetime]): Only events that end after it
+        end (Optional[datetime]): Only events that start before it
+        chunk_size (int): Number of bytes read at a time
+
+    Yields:
+        CachedEvent: Event
+    """
+    time_min = start.timestamp() if start else float("-inf")
+    time_max = end.timestamp() if end else float("inf")
+    chunks = read_chunks(path, chunk_size)
+    try:
+        first = b""
+        for first in chunks:
+            if first:
+                break
+        for event in detect_serializer(first).iter_loads(chain([first], chunks)):
+            if event_timestamp(event, "start") >= time_max:
+                break
+            if event_timestamp(event, "end") > time_min:
+                yield CachedEvent.from_dict(event)
+    finally:
+        chunks.close()
+
+
+def is_table(path: Path) -> bool:
+    """If a cache file is in the table format, see TableSerializer.
+
+    Args:
+        path (Path): path to the events file
 
     Returns:
-        List[Dict[str, Any]]: List of events as dictionaries
+        bool: If the file starts with the table header
     """
+    header = TableSerializer().header
+    try:
+        with open(path, "rb") as cache_file:
+            return cache_file.read(len(header)) == header
+    except OSError:
+        return False
 
-    json_events = load_events_file(path)
-    for event in json_events:
-        for att in ["start", "end"]:
-            event[att] = str_to_datetime(event[att])
 
-    return json_events
+def read_table(
+    path: Path, query: Callable[[EventTable], List[Dict[str, Any]]]
+) -> Optional[List[CachedEvent]]:
+    """Run a query on a cache file in the table format, mapped in memory.
+
+    Nothing is read up front: the pages of the file are only loaded when the
+    query reads them, and stay in the page cache for the next runs.
+
+    Args:
+        path (Path): path to the events file
+        query (Callable[[EventTable], List[Dict[str, Any]]]): Query, run on the table
+
+    Returns:
+        Optional[List[CachedEvent]]: Events returned by the query, or None
+            if the file cannot be read
+    """
+    try:
+        with open(path, "rb") as cache_file:
+            with mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return list(map(CachedEvent.from_dict, query(EventTable(data))))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def read_index(path: Path, index: mmap.mmap) -> Optional[Tuple[IndexColumn, IndexColumn]]:
+    """Read the arrays of the index of a cache file, see ReminderIndex.
+
+    Args:
+        path (Path): path to the events file
+        index (mmap.mmap): Content of its index file
+
+    Returns:
+        Optional[Tuple[IndexColumn, IndexColumn]]: Fire times of the reminders and
+            starts of the events, or None if the index is not up to date
+    """
+    header = len(INDEX_MAGIC) + 64
+    if index[:header] != INDEX_MAGIC + hash_path(path).read_bytes():
+        return None
+    reminders, spans = INDEX_COUNTS.unpack_from(index, header)
+    offset = header + INDEX_COUNTS.size
+    fire_times = IndexColumn(index, offset, INDEX_ENTRY, reminders)
+    offset += reminders * INDEX_ENTRY.size
+    return fire_times, IndexColumn(index, offset, SPAN_ENTRY, spans)
+
+
+def load_window(path: Path, time_min: float, time_max: float) -> Optional[List[CachedEvent]]:
+    """Load the events of an indexed cache file that overlap a time window.
+
+    The events are sorted by start, so the ones that start before the end
+    of the window are a prefix of the file, and the latest end so far only
+    grows, so the ones that may end after its start are a suffix.
+
+    Args:
+        path (Path): path to the events file
+        time_min (float): Start of the window, in epoch seconds
+        time_max (float): End of the window, in epoch seconds
+
+    Returns:
+        Optional[List[CachedEvent]]: Events as LazyEvents, or None if the
+            file has no up to date index
+    """
+    if is_table(path):
+        return read_table(path, lambda table: table.between(time_min, time_max))
+    try:
+        with open(path, "rb") as cache_file, open(index_path(path), "rb") as index_file:
+            with mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                columns = read_index(path, index)
+                if columns is None:
+                    return None
+                starts = columns[1]
+                max_ends = IndexColumn(index, starts.offset, SPAN_ENTRY, len(starts), field=2)
+                first = bisect_right(max_ends, time_min)
+                last = bisect_left(starts, time_max, lo=first)
+                spans = [starts.entry(num) for num in range(first, last)]
+
+            serializer = detect_serializer(cache_file.read(64))
+            events = []
+            for start, end, _, offset, length in spans:
+                if end > time_min:
+                    record = os.pread(cache_file.fileno(), length, offset)
+                    events.append(LazyEvent(serializer, record, start, end))
+            return events
+    except (OSError, ValueError, EOFError, KeyError, struct.error):
+        return None
+
+
+def load_reminders(
+    path: Path = CACHE / "events_notify.json",
+    now: Optional[datetime] = None,
+) -> Optional[List[CachedEvent]]:
+    """Load only the events with a reminder to fire in the current minute.
+
+    The fire times are binary-searched in the index saved by get, and only
+    the matching events are decoded from the cache file.
+
+    Args:
+        path (Path): path to the events file
+        now (Optional[datetime]): Current time. Defaults to now
+
+    Returns:
+        Optional[List[CachedEvent]]: Events, or None if the
+            file has no up to date index
+    """
+    now = (now or datetime.now().astimezone()).timestamp()
+    if is_table(path):
+        return read_table(path, lambda table: table.reminders_between(now - 60, now))
+    try:
+        with open(path, "rb") as cache_file, open(index_path(path), "rb") as index_file:
+            with mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                columns = read_index(path, index)
+                if columns is None:
+                    return None
+                fire_times = columns[0]
+                first = bisect_right(fire_times, now - 60)
+                last = bisect_right(fire_times, now)
+                records = sorted({fire_times.entry(num)[1:3] for num in range(first, last)})
+
+            serializer = detect_serializer(cache_file.read(64))
+            events = []
+            for offset, length in records:
+                cache_file.seek(offset)
+                events.append(CachedEvent.from_dict(serializer.load_event(cache_file.read(length))))
+            return events
+    except (OSError, ValueError, EOFError, KeyError, struct.error):
+        return None
+
+
+def load_events_db(
+    period: Tuple[datetime, datetime],
+    cal_codes: Optional[Iterable[str]] = None,
+    path: Path = CACHE / "events.db",
+) -> List[CachedEvent]:
+    """Load the events that overlap a period from the SQLite event store.
+
+    Args:
+        period (Tuple[datetime, datetime]): (Start datetime, End datetime)
+        cal_codes (Optional[Iterable[str]]): Only events of these calendars
+        path (Path): path to the database
+
+    Returns:
+        List[CachedEvent]: List of events, sorted by start
+    """
+    events = SQLiteEventStore(path).events_between(*period, cal_codes)
+    return list(map(CachedEvent.from_dict, events))
+
+
+def load_reminders_db(
+    now: Optional[datetime] = None,
+    path: Path = CACHE / "events.db",
+) -> List[CachedEvent]:
+    """Load the events with a reminder to fire in the current minute from the SQLite event store.
+
+    Args:
+        now (Optional[datetime]): Current time. Defaults to now
+        path (Path): path to the database
+
+    Returns:
+        List[CachedEvent]: List of events, sorted by start
+    """
+    now = now or datetime.now().astimezone()
+    events = SQLiteEventStore(path).reminders_between(now - timedelta(minutes=1), now)
+    return list(map(CachedEvent.from_dict, events))
+
+
+def load_events_shards(
+    period: Tuple[date, date],
+    path: Path = CACHE / "shards",
+) -> List[CachedEvent]:
+    """Load the events shown on the days of a period from the per-day shards.
+
+    Args:
+        period (Tuple[date, date]): (Start date, End date), both included, as
+            given by define_period
+        path (Path): path to the shards directory
+
+    Returns:
+        List[CachedEvent]: List of events, sorted by start
+    """
+    return list(map(CachedEvent.from_dict, ShardedEventCache(path).load(*period)))
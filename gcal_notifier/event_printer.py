@@ -3,6 +3,7 @@ from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Tuple
 
 from gcal_notifier.globals import COLORS, GCAL_COLORS
+from gcal_notifier.serializers import CachedEvent
 from gcal_notifier.tabulate import tabulate
 
 
@@ -10,7 +11,7 @@ class SimpleGCalendarPrinter:
     """Printer for calendar events.
 
     Args:
-        events (List[Dict[str, Any]]): List of events
+        events (List[CachedEvent]): List of events
         general_params (Dict[str, Any]): General params
         calendar_params (Dict[str, Any]): Calendar params
         period (Tuple[datetime, datetime]): (Start datetime, End datetime)
@@ -18,24 +19,24 @@ class SimpleGCalendarPrinter:
         art_style (str): Style of output
 
     Attributes:
-        events (List[Dict[str, Any]]): List of events
+        events (List[CachedEvent]): List of events
         use_color (bool): Use colors in output
         art_style (str): Style of output
         time_min (datetime): Lower bound of time interval
         time_max (datetime): Upper bound of time interval
     """
 
-    events: List[Dict[str, Any]]
+    events: List[CachedEvent]
     use_color: bool
     art_style: str
     time_min: datetime
     time_max: datetime
-    agenda: Dict[date, List[Dict[str, Any]]]
+    agenda: Dict[date, List[CachedEvent]]
     fmt_cal: Dict[str, List[str]]
 
     def __init__(
         self,
-        events: List[Dict[str, Any]],
+        events: List[CachedEvent],
         general_params: Dict[str, Any],
         calendar_params: Dict[str, Any],
         period: Tuple[datetime, datetime],
@@ -46,7 +47,7 @@ class SimpleGCalendarPrinter:
         """__init__.
 
         Args:
-            events (List[Dict[str, Any]]): events
+            events (List[CachedEvent]): events
             general_params (Dict[str, Any]): general_params
             calendar_params (Dict[str, Any]): calendar_params
             period (Tuple[datetime, datetime]): period
@@ -96,23 +97,23 @@ class SimpleGCalendarPrinter:
             msg = self.get_colorcode(colorname) + msg + self.get_colorcode("default")
         return msg
 
-    def get_text_from_event(self, event: Dict[str, Any]) -> str:
+    def get_text_from_event(self, event: CachedEvent) -> str:
         """Format a colored text output from event.
 
         Args:
-            event (Dict[str, Any]): Event
+            event (CachedEvent): Event
 
         Returns:
             str: Formatted and colored text
         """
 
-        if event["end"] - event["start"] < timedelta(days=1):
-            display_txt = f"{event['start'].strftime('%H:%M')} - {event['summary']}"
+        if event.end - event.start < timedelta(days=1):
+            display_txt = f"{event.start.strftime('%H:%M')} - {event.summary}"
         else:
-            display_txt = f"{event['summary']}"
+            display_txt = f"{event.summary}"
 
-        default_color = self.calendar_params[event["cal_code"]].get("default_color", "default")
-        event_color = GCAL_COLORS.get(event["color_id"], default_color)
+        default_color = self.calendar_params[event.cal_code].get("default_color", "default")
+        event_color = GCAL_COLORS.get(event.color_id, default_color)
         colored = self.create_msg(display_txt, event_color)
 
         return colored
@@ -124,18 +125,21 @@ class SimpleGCalendarPrinter:
             for i in range((self.time_max - self.time_min).days + 1)
         }
 
-    def add_events_agenda(self, events: List[Dict[str, Any]]) -> None:
+    def add_events_agenda(self, events: List[CachedEvent]) -> None:
         """Add events to the weekly agenda in the string format.
 
         Args:
-            events (List[Dict[str, Any]]): List of events
+            events (List[CachedEvent]): List of events
         """
+        agenda = self.agenda
+        one_second = timedelta(seconds=1)
         for event in events:
-            duration = event["end"] - event["start"] - timedelta(seconds=1)
-            for to_add in range(duration.days + 1):
-                event_date = event["start"].date() + timedelta(days=to_add)
-                if event_date in self.agenda:
-                    self.agenda[event_date].append(event)
+            start = event.start
+            first_date = start.date()
+            for to_add in range((event.end - start - one_second).days + 1):
+                event_date = first_date + timedelta(days=to_add)
+                if event_date in agenda:
+                    agenda[event_date].append(event)
 
     def create_formatted_calendar(self) -> None:
         """Creates the formatted calendar for "week" and "month" formats."""
@@ -190,9 +194,9 @@ class SimpleGCalendarPrinter:
                 if next_event_found:
                     break
                 for event in events:
-                    if event["start"] > datetime.now().astimezone():
+                    if event.start > datetime.now().astimezone():
                         print(
-                            f"{event['start'].strftime('%a, %H:%M')} ({event['calendar']}) - {event['summary']}"
+                            f"{event.start.strftime('%a, %H:%M')} ({event.calendar}) - {event.summary}"
                         )
                         next_event_found = True
                         break
@@ -1,7 +1,8 @@
-from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from gcal_notifier.globals import CMD
+from gcal_notifier.serializers import CachedEvent, event_timestamp
 from gcal_notifier.utils import run_notify
 
 
@@ -9,19 +10,19 @@ class SimpleGCalendarNotifier:
     """Notifier for GoogleCalendar events.
 
     Args:
-        events (List[Dict[str, Any]]): List of all cached events
+        events (List[CachedEvent]): List of all cached events
         general_params (Dict[str, Any]): General params
         calendar_params (Dict[str, Any]): Calendar params
 
     Attributes:
-        events (List[Dict[str, Any]]): List of all events
+        events (List[CachedEvent]): List of all events
     """
 
-    events: List[Dict[str, Any]]
+    events: List[CachedEvent]
 
     def __init__(
         self,
-        events: List[Dict[str, Any]],
+        events: List[CachedEvent],
         general_params: Dict[str, Any],
         calendar_params: Dict[str, Any],
     ) -> None:
@@ -29,42 +30,60 @@ class SimpleGCalendarNotifier:
         self.events = events
         self.general_params = general_params
 
-    def search_reminders(self) -> None:
-        """Search current reminders to notify."""
-        now = datetime.now().astimezone()
+    def search_reminders(self, now: Optional[datetime] = None) -> None:
+        """Search current reminders to notify.
+
+        Times are compared as epoch seconds, so events loaded with epoch
+        timestamps only get datetimes when they are notified.
+
+        Args:
+            now (Optional[datetime]): Current time. Defaults to now
+        """
+        now = (now or datetime.now().astimezone()).timestamp()
         for event in self.events:
-            start = event["start"]
-            if now > start + timedelta(minutes=1):
+            start = event_timestamp(event, "start")
+            if now > start + 60:
                 continue
-            for reminder in event["reminders"]:
-                if now < start - timedelta(minutes=reminder):
-                    continue
-                elif now >= start - timedelta(minutes=reminder) and now < start - timedelta(
-                    minutes=reminder - 1
-                ):
-                    cmd = self.create_command(event, event.get("cmd", CMD))
-                    run_notify(
-                        cmd,
-                        self.general_params["notification_sound"],
-                        self.general_params["notification_sound_path"],
-                    )
+            for reminder in event.reminders:
+                fire = start - reminder * 60
+                if fire <= now < fire + 60:
+                    self.notify(event)
+
+    def notify(self, event: CachedEvent) -> None:
+        """Run the notify command of an event, and the sound if set.
+
+        Args:
+            event (CachedEvent): Event to notify
+        """
+        run_notify(
+            self.create_command(event, event.get("cmd", CMD)),
+            self.general_params["notification_sound"],
+            self.general_params["notification_sound_path"],
+        )
 
     @staticmethod
-    def create_command(event: Dict[str, Any], cmd: str = CMD) -> str:
+    def create_command(event: CachedEvent, cmd: str = CMD) -> str:
         """Create a notify command formatting a cmd string.
 
         Args:
-            event (Dict[str, Any]): Event info
+            event (CachedEvent): Event info
             cmd (str): Base command to format
         """
         formatters = {
-            "title": f'"{event.get("summary", None)}"',
-            "calendar": f'"{event.get("calendar", None)}"',
-            "start": f'"{event.get("start", None).strftime("%H:%M")}"',
-            "end": f'"{event.get("end", None).strftime("%H:%M")}"',
-            "description": f'"{event.get("description", None)}"',
-            "link": f'"{event.get("other").get("hangoutLink", None)}"',
+            key: f'"{value}"'
+            for key, value in {**event.other, **event}.items()
+            if isinstance(value, (str, int))
         }
+        formatters.update(
+            {
+                "title": f'"{event.summary}"',
+                "calendar": f'"{event.calendar}"',
+                "start": f'"{event.start.strftime("%H:%M")}"',
+                "end": f'"{event.end.strftime("%H:%M")}"',
+                "description": f'"{event.description}"',
+                "link": f'"{event.other.get("hangoutLink", None)}"',
+            }
+        )
         if not formatters["link"]:
             formatters["link"] = formatters["description"]
 
@@ -1,37 +1,107 @@
+import hashlib
+import heapq
 import json
-from datetime import datetime, time
+import os
+import struct
+import tempfile
+from datetime import date, datetime, time
+from functools import partial
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypedDict
 
 from gcsa.event import Event
 
+from gcal_notifier.compressors import Compressor, get_compressor
+from gcal_notifier.event_shards import MANIFEST, ShardedEventCache
+from gcal_notifier.event_store import SQLiteEventStore
 from gcal_notifier.globals import CACHE
+from gcal_notifier.serializers import Serializer, get_serializer
 
 TZINFO = datetime.utcnow().astimezone().tzinfo
 
+INDEX_MAGIC = b"#gcal_notifier:index2\n"
 
-def event_to_dict(event: Event) -> Dict[str, Any]:
-    """Transform instance of Event to Dict.
+INDEX_COUNTS = struct.Struct("<II")
+
+INDEX_ENTRY = struct.Struct("<qIIi")
+
+SPAN_ENTRY = struct.Struct("<qqqII")
+
+
+class EventRecord(TypedDict, total=False):
+    """Cached event, with the fields read by notify and print.
+
+    Extra fields asked for in extra_fields are added next to these, or to
+    other if they are not Event attributes.
+    """
+
+    event_id: str
+    cal_code: str
+    calendar: str
+    summary: str
+    description: Optional[str]
+    start: datetime
+    end: datetime
+    color_id: Optional[str]
+    reminders: List[int]
+    other: Dict[str, Any]
+
+
+RECORD_FIELDS = (
+    "event_id",
+    "cal_code",
+    "calendar",
+    "summary",
+    "description",
+    "start",
+    "end",
+    "color_id",
+    "reminders",
+)
+
+RECORD_OTHER_FIELDS = ("hangoutLink",)
+
+
+def event_to_dict(event: Event, extra_fields: Iterable[str] = ()) -> EventRecord:
+    """Transform instance of Event to a cached event.
+
+    The start and end of all-day events are turned into datetimes at
+    midnight, so every cached event can be compared and sorted by start.
 
     Args:
         event (Event): Event
+        extra_fields (Iterable[str]): Other Event attributes or raw event fields to keep
 
     Returns:
-        Dict[str, Any]: Dict with the attributes of Event
+        EventRecord: Dict with the cached attributes of Event
     """
-    return event.__dict__
-
-
-def events_to_json(events: List[Event]) -> List[Dict[str, Any]]:
+    record = {field: getattr(event, field, None) for field in RECORD_FIELDS}
+    if not isinstance(record["start"], datetime):
+        record["start"] = date_to_datetime(record["start"])
+        record["end"] = date_to_datetime(record["end"])
+    other = event.other or {}
+    record["other"] = {key: other[key] for key in RECORD_OTHER_FIELDS if key in other}
+    for field in extra_fields:
+        if field in other:
+            record["other"][field] = other[field]
+        elif field != "other":
+            record[field] = getattr(event, field, None)
+    return record
+
+
+def events_to_json(events: List[Event], extra_fields: Iterable[str] = ()) -> List[EventRecord]:
     """Transforms list of Events to list of dicts.
 
     Args:
         events (List[Event]): List of Events
+        extra_fields (Iterable[str]): Other Event attributes or raw event fields to keep
 
     Returns:
-        List[Dict[str, Any]]: List of Dicts with the Events attributes
+        List[EventRecord]: List of Dicts with the cached Events attributes
     """
-    return list(map(event_to_dict, events))
+    extra_fields = tuple(extra_fields)
+    return [event_to_dict(event, extra_fields) for event in events]
 
 
 def date_to_datetime(date_obj: Any) -> Any:
@@ -46,65 +116,523 @@ def date_to_datetime(date_obj: Any) -> Any:
     return datetime.combine(date_obj, time(tzinfo=TZINFO))
 
 
-def event_sorter(event: Dict[str, Any]) -> Any:
-    """Returns start date as datetime for sorting.
-
-    Args:
-        event (Dict[str, Any]): Event
-
-    Returns:
-        datetime: Start time as datetime object
-    """
-    start = event.get("start")
-    if not isinstance(start, datetime):
-        event["start"] = date_to_datetime(start)
-        event["end"] = date_to_datetime(event.get("end"))
-    return event.get("start")
-
-
-def transform_events(events: List[Event]) -> List[Dict[str, Any]]:
+def transform_events(events: List[Event], extra_fields: Iterable[str] = ()) -> List[Dict[str, Any]]:
     """Transform list of events to a sorted list of dicts.
 
+    For events that are already sorted by start within each calendar,
+    merge_events avoids the sort.
+
     Args:
         events (List[Event]): List of events
+        extra_fields (Iterable[str]): Other Event attributes or raw event fields to keep
 
     Returns:
         List[Dict[str, Any]]: List of sorted dict events
     """
 
-    json_events = events_to_json(events)
-    json_events.sort(key=event_sorter)
+    json_events = events_to_json(events, extra_fields)
+    json_events.sort(key=itemgetter("start"))
     return json_events
 
 
-def save_events(events: List[Event], file_path: Path = CACHE / "events_notify.json") -> None:
+def save_events(
+    events: List[Event],
+    file_path: Path = CACHE / "events_notify.json",
+    cache_format: str = "json",
+    reminder_index: bool = False,
+    extra_fields: Iterable[str] = (),
+    compression: str = "none",
+) -> None:
     """Save events to a cache file.
 
+    The file is replaced atomically, and not touched at all when the events
+    did not change since the last save.
+
     Args:
         events (List[Event]): List of Events
         file_path (str): Path to file to be saved
+        cache_format (str): Format of the file, see serializers
+        reminder_index (bool): Also save the fire times of the reminders, see ReminderIndex
+        extra_fields (Iterable[str]): Other Event attributes or raw event fields to keep
+        compression (str): Compression of the file, see compressors
+    """
+
+    json_events = transform_events(events, extra_fields)
+    save_json_events(json_events, file_path, cache_format, reminder_index, compression)
+
+
+def save_json_events(
+    json_events: List[Dict[str, Any]],
+    file_path: Path = CACHE / "events_notify.json",
+    cache_format: str = "json",
+    reminder_index: bool = False,
+    compression: str = "none",
+) -> None:
+    """Save dict events to a cache file, like save_events.
+
+    Compressed files are saved without reminder index, since the index
+    locates the events in the uncompressed content.
+
+    Args:
+        json_events (List[Dict[str, Any]]): Dict events sorted by start, see merge_events
+        file_path (str): Path to file to be saved
+        cache_format (str): Format of the file, see serializers
+        reminder_index (bool): Also save the fire times of the reminders, see ReminderIndex
+        compression (str): Compression of the file, see compressors
+    """
+    serializer = get_serializer(cache_format)
+    compressor = get_compressor(compression)
+    if compressor is not None:
+        index_path(file_path).unlink(missing_ok=True)
+        write_atomic(file_path, compressor.compress(serializer.dumps(json_events)))
+        return
+    if not reminder_index or not serializer.indexable:
+        write_atomic(file_path, serializer.dumps(json_events))
+        return
+
+    index = ReminderIndex()
+    chunks = [serializer.dump_start()]
+    offset = len(chunks[0])
+    for num, event in enumerate(json_events):
+        chunk = serializer.dump_event(event, num)
+        skip = serializer.record_offset(num)
+        index.add(event, offset + skip, len(chunk) - skip)
+        chunks.append(chunk)
+        offset += len(chunk)
+    chunks.append(serializer.dump_end(len(json_events)))
+
+    content = b"".join(chunks)
+    write_atomic(file_path, content)
+    write_atomic(index_path(file_path), index.dumps(hashlib.sha256(content).hexdigest()))
+
+
+def index_path(file_path: Path) -> Path:
+    """Path to the index of a cache file.
+
+    Args:
+        file_path (Path): Cache file
+
+    Returns:
+        Path: Index file, next to the cache file
+    """
+    return file_path.with_name(f"{file_path.name}.idx")
+
+
+class ReminderIndex:
+    """Fire times of the reminders and time spans of the events of a cache file.
+
+    The index holds two flat arrays. The first has (fire_epoch, offset,
+    length, minutes_before) entries sorted by fire time: notify
+    binary-searches the current minute in it. The second has (start_epoch,
+    end_epoch, max_end_epoch, offset, length) entries in file order, that
+    is sorted by start, where max_end_epoch is the latest end of the events
+    so far: loaders binary-search a time window in it. In both, offset and
+    length locate the event in the cache file, so only the matching events
+    are decoded. The index starts with the SHA-256 of the cache file, so an
+    index left from another save is ignored.
+
+    Attributes:
+        entries (List[Tuple[int, int, int, int]]): Reminder entries, not sorted yet
+        spans (List[Tuple[int, int, int, int]]): (start, end, offset, length) of the events
+    """
+
+    entries: List[Tuple[int, int, int, int]]
+    spans: List[Tuple[int, int, int, int]]
+
+    def __init__(self) -> None:
+        self.entries = []
+        self.spans = []
+
+    def add(self, event: Dict[str, Any], offset: int, length: int) -> None:
+        """Add an event and its reminders, in file order.
+
+        Args:
+            event (Dict[str, Any]): Dict event, with datetime start and end
+            offset (int): Position of the event in the cache file
+            length (int): Size of the event in the cache file
+        """
+        start = int(event["start"].timestamp())
+        self.spans.append((start, int(event["end"].timestamp()), offset, length))
+        for minutes in event.get("reminders") or []:
+            self.entries.append((start - minutes * 60, offset, length, minutes))
+
+    def dumps(self, digest: str) -> bytes:
+        """Encode the index.
+
+        Args:
+            digest (str): SHA-256 hex digest of the cache file
+
+        Returns:
+            bytes: Content of the index file
+        """
+        self.entries.sort()
+        chunks = [
+            INDEX_MAGIC,
+            digest.encode(),
+            INDEX_COUNTS.pack(len(self.entries), len(self.spans)),
+        ]
+        chunks.extend(INDEX_ENTRY.pack(*entry) for entry in self.entries)
+        max_end = float("-inf")
+        for start, end, offset, length in self.spans:
+            max_end = max(max_end, end)
+            chunks.append(SPAN_ENTRY.pack(start, end, max_end, offset, length))
+        return b"".join(chunks)
+
+
+def hash_path(file_path: Path) -> Path:
+    """Path to the file storing the content hash of a cache file.
+
+    Args:
+        file_path (Path): Cache file
+
+    Returns:
+        Path: Hash file, next to the cache file
+    """
+    return file_path.with_name(f".{file_path.name}.sha256")
+
+
+def is_unchanged(file_path: Path, digest: str) -> bool:
+    """Check if a cache file already has a given content.
+
+    Args:
+        file_path (Path): Cache file
+        digest (str): SHA-256 hex digest of the content
+
+    Returns:
+        bool: If the file exists and its last saved content has the same hash
     """
+    try:
+        return file_path.exists() and hash_path(file_path).read_text() == digest
+    except OSError:
+        return False
+
 
-    json_events = transform_events(events)
+def open_temp(file_path: Path) -> IO[bytes]:
+    """Open a temporary file next to a cache file, to replace it later.
+
+    Args:
+        file_path (Path): Cache file
 
+    Returns:
+        IO[bytes]: Temporary file, opened for binary writing
+    """
     file_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(file_path, "w") as json_out:
-        json.dump(
-            json_events,
-            json_out,
-            ensure_ascii=False,
-            indent=4,
-            cls=DatetimeEncoder,
+    return tempfile.NamedTemporaryFile(
+        dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp", delete=False
+    )
+
+
+def replace_file(
+    temp_file: IO[bytes], file_path: Path, digest: str, hash_file: bool = True
+) -> bool:
+    """Move a written temporary file over a cache file, unless nothing changed.
+
+    Readers see either the old or the new content, never a partial file.
+
+    Args:
+        temp_file (IO[bytes]): Temporary file from open_temp, still open
+        file_path (Path): Cache file
+        digest (str): SHA-256 hex digest of the content of the temporary file
+        hash_file (bool): Keep the hash next to the file, to skip unchanged writes
+
+    Returns:
+        bool: If the cache file was replaced
+    """
+    if hash_file and is_unchanged(file_path, digest):
+        temp_file.close()
+        os.unlink(temp_file.name)
+        return False
+
+    temp_file.flush()
+    os.fsync(temp_file.fileno())
+    temp_file.close()
+    if hash_file:
+        hash_path(file_path).unlink(missing_ok=True)
+    os.replace(temp_file.name, file_path)
+    if hash_file:
+        hash_path(file_path).write_text(digest)
+    return True
+
+
+def write_atomic(file_path: Path, content: bytes, hash_file: bool = True) -> bool:
+    """Atomically replace a cache file, unless it already has the content.
+
+    Args:
+        file_path (Path): Cache file
+        content (bytes): New content
+        hash_file (bool): Keep the hash next to the file, to skip unchanged writes.
+            Without it, the file is always written
+
+    Returns:
+        bool: If the cache file was written
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    if hash_file and is_unchanged(file_path, digest):
+        return False
+
+    temp_file = open_temp(file_path)
+    try:
+        temp_file.write(content)
+    except BaseException:
+        temp_file.close()
+        os.unlink(temp_file.name)
+        raise
+    return replace_file(temp_file, file_path, digest, hash_file)
+
+
+def merge_events(
+    streams: Iterable[Iterable[Event]], extra_fields: Iterable[str] = ()
+) -> Iterator[Dict[str, Any]]:
+    """Merge streams of events already sorted by start into one sorted stream.
+
+    Each event is transformed once, when it is read from its stream, and
+    the streams are merged with a heap, in O(n log k) for k streams. The
+    merged events can be written while the streams are still being read.
+
+    Args:
+        streams (Iterable[Iterable[Event]]): Streams of events, e.g. one per calendar
+        extra_fields (Iterable[str]): Other Event attributes or raw event fields to keep
+
+    Returns:
+        Iterator[Dict[str, Any]]: Sorted dict events
+    """
+    to_dict = partial(event_to_dict, extra_fields=tuple(extra_fields))
+    return heapq.merge(*(map(to_dict, stream) for stream in streams), key=itemgetter("start"))
+
+
+def period_filter(period: Tuple[date, date]) -> Callable[[Dict[str, Any]], bool]:
+    """Create a filter of the dict events that overlap a period.
+
+    Args:
+        period (Tuple[date, date]): (Start date, End date)
+
+    Returns:
+        Callable[[Dict[str, Any]], bool]: If a sorted dict event overlaps the period
+    """
+    time_min, time_max = map(date_to_datetime, period)
+    return lambda event: event["end"] > time_min and event["start"] < time_max
+
+
+def save_events_stream(
+    streams: Iterable[Iterable[Event]],
+    files: Dict[Path, Tuple[date, date]],
+    cache_format: str = "json",
+    indexed_files: Iterable[Path] = (),
+    extra_fields: Iterable[str] = (),
+    compression: str = "none",
+    compressed_files: Iterable[Path] = (),
+) -> None:
+    """Save events to cache files while they are fetched.
+
+    The streams are merged by start and every event is written as soon as it
+    is read, to each file whose period it overlaps, so only the current page
+    of each stream is kept in memory. The files are the same as the ones
+    written by save_events.
+
+    Args:
+        streams (Iterable[Iterable[Event]]): Streams of events sorted by start, e.g. one per calendar
+        files (Dict[Path, Tuple[date, date]]): Period of events saved to each file
+        cache_format (str): Format of the files, see serializers
+        indexed_files (Iterable[Path]): Files saved with a reminder index
+        extra_fields (Iterable[str]): Other Event attributes or raw event fields to keep
+        compression (str): Compression of the compressed files, see compressors
+        compressed_files (Iterable[Path]): Files saved compressed, without reminder index
+    """
+    compressor = get_compressor(compression)
+    indexed_files = set(indexed_files)
+    compressed_files = set(compressed_files)
+    # One serializer per file, since the table one keeps the events it was given
+    writers = [
+        (
+            EventStreamWriter(
+                path,
+                get_serializer(cache_format),
+                path in indexed_files,
+                compressor if path in compressed_files else None,
+            ),
+            period_filter(period),
         )
+        for path, period in files.items()
+    ]
+    try:
+        for event in merge_events(streams, extra_fields):
+            for writer, in_period in writers:
+                if in_period(event):
+                    writer.write(event)
+    except BaseException:
+        for writer, _ in writers:
+            writer.abort()
+        raise
+    for writer, _ in writers:
+        writer.close()
+
+
+def save_events_db(
+    events: Iterable[Event],
+    period: Tuple[date, date],
+    db_path: Path = CACHE / "events.db",
+    extra_fields: Iterable[str] = (),
+) -> None:
+    """Save the events fetched for a period to the SQLite event store.
 
+    Args:
+        events (Iterable[Event]): Events, in any order
+        period (Tuple[date, date]): (Start date, End date) that was fetched
+        db_path (Path): Path to the database
+        extra_fields (Iterable[str]): Other Event attributes or raw event fields to keep
+    """
+    in_period = period_filter(period)
+    extra_fields = tuple(extra_fields)
+
+    def dict_events() -> Iterator[Dict[str, Any]]:
+        for event in events:
+            event = event_to_dict(event, extra_fields)
+            if in_period(event):
+                yield event
+
+    SQLiteEventStore(db_path).save(dict_events(), map(date_to_datetime, period))
 
-class DatetimeEncoder(json.JSONEncoder):
-    """Encoder for datetime objects."""
 
-    def default(self, o: Any) -> str:
-        try:
-            return json.JSONEncoder.default(self, o)
-        except TypeError:
-            if isinstance(o, datetime):
-                return o.strftime("%Y-%m-%d %H:%M:%S%z")
-            return str(o)
+def save_events_shards(
+    json_events: Iterable[Dict[str, Any]],
+    period: Tuple[date, date],
+    cache_format: str = "json",
+    path: Path = CACHE / "shards",
+    compression: str = "none",
+) -> None:
+    """Save the dict events fetched for a period to the per-day shards.
+
+    Only the shards whose content changed are written. The shards of the
+    period with no events and the ones before the period are deleted, the
+    ones after it are kept.
+
+    Args:
+        json_events (Iterable[Dict[str, Any]]): Dict events sorted by start, see merge_events
+        period (Tuple[date, date]): (Start date, End date) that was fetched
+        cache_format (str): Format of the shards, see serializers
+        path (Path): Directory of the shards
+        compression (str): Compression of the shards, see compressors
+    """
+    cache = ShardedEventCache(path)
+    serializer = get_serializer(cache_format)
+    compressor = get_compressor(compression)
+    previous = cache.read_manifest()
+    manifest = {day: digest for day, digest in previous.items() if day >= period[1].isoformat()}
+
+    shards = cache.split(json_events, period)
+    for day, day_events in shards.items():
+        shard_path = cache.shard_path(day)
+        if not day_events:
+            shard_path.unlink(missing_ok=True)
+            continue
+        content = serializer.dumps(day_events)
+        if compressor is not None:
+            content = compressor.compress(content)
+        digest = hashlib.sha256(content).hexdigest()
+        if previous.get(day.isoformat()) != digest or not shard_path.exists():
+            write_atomic(shard_path, content, hash_file=False)
+        manifest[day.isoformat()] = digest
+
+    for shard_path in path.glob("*.events"):
+        if shard_path.stem < period[0].isoformat():
+            shard_path.unlink()
+    content = json.dumps({"shards": dict(sorted(manifest.items()))}, indent=4)
+    write_atomic(path / MANIFEST, content.encode())
+
+
+class EventStreamWriter:
+    """Writer of dict events to a cache file, one event at a time.
+
+    The events are written to a temporary file, which atomically replaces the
+    cache file on close if its content changed.
+
+    Args:
+        file_path (Path): Path to file to be saved
+        serializer (Serializer): Format of the file, not shared with other writers
+        reminder_index (bool): Also save the fire times of the reminders,
+            unless the file is compressed
+        compressor (Optional[Compressor]): Compression of the file
+
+    Attributes:
+        file_path (Path): Path to file to be saved
+        serializer (Serializer): Format of the file
+        index (Optional[ReminderIndex]): Reminder index, if saved
+        compressobj (Any): Incremental compressor, if the file is compressed
+        file (IO[bytes]): Opened temporary file
+        hash (hashlib._Hash): SHA-256 of the content written so far
+        size (int): Number of bytes written
+        count (int): Number of events written
+    """
+
+    file_path: Path
+    serializer: Serializer
+    index: Optional[ReminderIndex]
+    compressobj: Any
+    file: IO[bytes]
+    size: int
+    count: int
+
+    def __init__(
+        self,
+        file_path: Path,
+        serializer: Optional[Serializer] = None,
+        reminder_index: bool = False,
+        compressor: Optional[Compressor] = None,
+    ) -> None:
+        self.file_path = file_path
+        self.serializer = serializer or get_serializer()
+        self.index = (
+            ReminderIndex()
+            if reminder_index and compressor is None and self.serializer.indexable
+            else None
+        )
+        self.compressobj = compressor.compressobj() if compressor else None
+        self.file = open_temp(file_path)
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.count = 0
+        self.append(self.serializer.dump_start())
+
+    def append(self, data: bytes) -> None:
+        """Write raw data to the file.
+
+        Args:
+            data (bytes): Data
+        """
+        if self.compressobj is not None:
+            data = self.compressobj.compress(data)
+        self.hash.update(data)
+        self.file.write(data)
+        self.size += len(data)
+
+    def write(self, event: Dict[str, Any]) -> None:
+        """Append an event to the file.
+
+        Args:
+            event (Dict[str, Any]): Dict event
+        """
+        chunk = self.serializer.dump_event(event, self.count)
+        if self.index is not None:
+            skip = self.serializer.record_offset(self.count)
+            self.index.add(event, self.size + skip, len(chunk) - skip)
+        self.append(chunk)
+        self.count += 1
+
+    def close(self) -> None:
+        """Finish the file and replace the cache file with it."""
+        self.append(self.serializer.dump_end(self.count))
+        if self.compressobj is not None:
+            tail = self.compressobj.flush()
+            self.hash.update(tail)
+            self.file.write(tail)
+            self.size += len(tail)
+            index_path(self.file_path).unlink(missing_ok=True)
+        digest = self.hash.hexdigest()
+        replace_file(self.file, self.file_path, digest)
+        if self.index is not None:
+            write_atomic(index_path(self.file_path), self.index.dumps(digest))
+
+    def abort(self) -> None:
+        """Discard the file, leaving the cache file as it was."""
+        self.file.close()
+        os.unlink(self.file.name)
@@ -0,0 +1,133 @@
+import heapq
+import json
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from gcal_notifier.compressors import decompress
+from gcal_notifier.globals import CACHE
+from gcal_notifier.serializers import detect_serializer, event_timestamp
+
+MANIFEST = "manifest.json"
+
+
+def shard_days(event: Dict[str, Any]) -> Iterator[date]:
+    """Days an event is shown on, the same way the printer's agenda does.
+
+    Args:
+        event (Dict[str, Any]): Dict event, with datetime start and end
+
+    Yields:
+        date: Day of the event
+    """
+    duration = event["end"] - event["start"] - timedelta(seconds=1)
+    first = event["start"].date()
+    for num in range(max(duration.days, 0) + 1):
+        yield first + timedelta(days=num)
+
+
+def days_between(time_min: date, time_max: date) -> Iterator[date]:
+    """Days of a range, both ends included.
+
+    Args:
+        time_min (date): First day
+        time_max (date): Last day
+
+    Yields:
+        date: Day
+    """
+    for num in range((time_max - time_min).days + 1):
+        yield time_min + timedelta(days=num)
+
+
+class ShardedEventCache:
+    """Event cache with one file per day and a manifest.
+
+    Every shard holds the events shown on its day, sorted by start, in any
+    cache format and compression. The manifest lists the shards and the SHA-256 of each,
+    so a save only writes the shards that changed (see save_events_shards),
+    and a load only reads the shards of the requested days, however far
+    ahead the cache goes.
+
+    Args:
+        path (Path): Directory of the shards
+
+    Attributes:
+        path (Path): Directory of the shards
+    """
+
+    path: Path
+
+    def __init__(self, path: Path = CACHE / "shards") -> None:
+        self.path = path
+
+    def shard_path(self, day: date) -> Path:
+        """Path to the shard of a day.
+
+        Args:
+            day (date): Day
+
+        Returns:
+            Path: Shard file
+        """
+        return self.path / f"{day.isoformat()}.events"
+
+    def read_manifest(self) -> Dict[str, str]:
+        """Shards that exist and their SHA-256, by ISO day.
+
+        Returns:
+            Dict[str, str]: Hex digest of each shard
+        """
+        try:
+            return json.loads((self.path / MANIFEST).read_bytes())["shards"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def split(
+        self, events: Iterable[Dict[str, Any]], period: Tuple[date, date]
+    ) -> Dict[date, List[Dict[str, Any]]]:
+        """Group events by the days of a period they are shown on.
+
+        Args:
+            events (Iterable[Dict[str, Any]]): Dict events sorted by start
+            period (Tuple[date, date]): (Start date, End date), end excluded
+
+        Returns:
+            Dict[date, List[Dict[str, Any]]]: Events of every day of the period,
+                empty days included
+        """
+        time_min, time_max = period
+        shards: Dict[date, List[Dict[str, Any]]] = {
+            day: [] for day in days_between(time_min, time_max - timedelta(days=1))
+        }
+        for event in events:
+            for day in shard_days(event):
+                if day in shards:
+                    shards[day].append(event)
+        return shards
+
+    def load(self, time_min: date, time_max: date) -> List[Dict[str, Any]]:
+        """Load the events shown on a range of days.
+
+        Args:
+            time_min (date): First day
+            time_max (date): Last day, included
+
+        Returns:
+            List[Dict[str, Any]]: Dict events sorted by start, each one once
+        """
+        manifest = self.read_manifest()
+        shards = []
+        for day in days_between(time_min, time_max):
+            if day.isoformat() in manifest:
+                data = decompress(self.shard_path(day).read_bytes())
+                shards.append(detect_serializer(data).loads(data))
+
+        events = []
+        seen = set()
+        for event in heapq.merge(*shards, key=event_timestamp):
+            key = (event.get("cal_code"), event.get("event_id"), event_timestamp(event))
+            if key not in seen:
+                seen.add(key)
+                events.append(event)
+        return events
@@ -0,0 +1,199 @@
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from gcal_notifier.globals import CACHE
+from gcal_notifier.serializers import CompactJSONSerializer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    cal_code TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    saved INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (cal_code, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_time);
+CREATE INDEX IF NOT EXISTS events_cal_code ON events (cal_code, start_time);
+CREATE TABLE IF NOT EXISTS reminders (
+    cal_code TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    fire_time INTEGER NOT NULL,
+    minutes INTEGER NOT NULL,
+    FOREIGN KEY (cal_code, event_id) REFERENCES events ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS reminders_fire ON reminders (fire_time);
+CREATE INDEX IF NOT EXISTS reminders_event ON reminders (cal_code, event_id);
+"""
+
+UPSERT_EVENT = """
+INSERT INTO events (cal_code, event_id, start_time, end_time, saved, data)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (cal_code, event_id) DO UPDATE SET
+    start_time = excluded.start_time,
+    end_time = excluded.end_time,
+    saved = excluded.saved,
+    data = excluded.data
+"""
+
+
+class SQLiteEventStore:
+    """Event cache in a SQLite database, queried by time range.
+
+    Events are stored as compact JSON rows keyed by (cal_code, event_id),
+    with their start and end as epoch seconds, next to a table with the
+    fire time of each reminder. Both are indexed, so notify and print read
+    only the rows they need instead of parsing a whole cache file.
+
+    Args:
+        path (Path): Path to the database
+
+    Attributes:
+        path (Path): Path to the database
+        serializer (CompactJSONSerializer): Format of the event rows
+    """
+
+    path: Path
+    serializer: CompactJSONSerializer
+
+    def __init__(self, path: Path = CACHE / "events.db") -> None:
+        self.path = path
+        self.serializer = CompactJSONSerializer()
+
+    def connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """Open the database.
+
+        A read-write connection creates the database and its tables if
+        needed, in WAL mode so readers are not blocked while get saves. A
+        read-only one, for notify and print, changes nothing on disk.
+
+        Args:
+            read_only (bool): Open the existing database without write access
+
+        Returns:
+            sqlite3.Connection: Connection
+        """
+        if read_only:
+            return sqlite3.connect(f"{self.path.as_uri()}?mode=ro", uri=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def save(self, events: Iterable[Dict[str, Any]], period: Iterable[datetime]) -> None:
+        """Upsert the events fetched for a period.
+
+        Events of the period that were not fetched again were deleted or
+        moved, so they are removed, along with the events that ended before
+        the period. Readers keep seeing the previous events until the
+        transaction commits.
+
+        Args:
+            events (Iterable[Dict[str, Any]]): Dict events, with datetime start and end
+            period (Iterable[datetime]): (Start datetime, End datetime) that was fetched
+        """
+        time_min, time_max = (int(value.timestamp()) for value in period)
+        saved = time.time_ns()
+        event_rows = []
+        reminder_rows = []
+        for event in events:
+            key = (event.get("cal_code"), event["event_id"])
+            start = int(event["start"].timestamp())
+            event_rows.append(
+                (
+                    *key,
+                    start,
+                    int(event["end"].timestamp()),
+                    saved,
+                    self.serializer.dump_event(event, 0).decode(),
+                )
+            )
+            for minutes in event.get("reminders") or []:
+                reminder_rows.append((*key, start - minutes * 60, minutes))
+
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany(UPSERT_EVENT, event_rows)
+                conn.executemany(
+                    "DELETE FROM reminders WHERE cal_code = ? AND event_id = ?",
+                    (row[:2] for row in event_rows),
+                )
+                conn.executemany(
+                    "INSERT INTO reminders (cal_code, event_id, fire_time, minutes)"
+                    " VALUES (?, ?, ?, ?)",
+                    reminder_rows,
+                )
+                conn.execute(
+                    "DELETE FROM events WHERE end_time <= ?"
+                    " OR (saved != ? AND end_time > ? AND start_time < ?)",
+                    (time_min, saved, time_min, time_max),
+                )
+        finally:
+            conn.close()
+
+    def events_between(
+        self,
+        time_min: datetime,
+        time_max: datetime,
+        cal_codes: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Events that overlap a time range, sorted by start.
+
+        Args:
+            time_min (datetime): Start of the range
+            time_max (datetime): End of the range
+            cal_codes (Optional[Iterable[str]]): Only events of these calendars
+
+        Returns:
+            List[Dict[str, Any]]: Dict events
+        """
+        query = "SELECT data FROM events WHERE start_time < ? AND end_time > ?"
+        params: List[Any] = [int(time_max.timestamp()), int(time_min.timestamp())]
+        if cal_codes is not None:
+            cal_codes = list(cal_codes)
+            query += f" AND cal_code IN ({', '.join('?' * len(cal_codes))})"
+            params += cal_codes
+        return self.fetch(query + " ORDER BY start_time, rowid", params)
+
+    def reminders_between(self, time_min: datetime, time_max: datetime) -> List[Dict[str, Any]]:
+        """Events with a reminder that fires in a time range.
+
+        Args:
+            time_min (datetime): Start of the range, excluded
+            time_max (datetime): End of the range, included
+
+        Returns:
+            List[Dict[str, Any]]: Dict events, sorted by start
+        """
+        return self.fetch(
+            "SELECT data FROM events WHERE (cal_code, event_id) IN ("
+            " SELECT cal_code, event_id FROM reminders WHERE fire_time > ? AND fire_time <= ?"
+            ") ORDER BY start_time, rowid",
+            [int(time_min.timestamp()), int(time_max.timestamp())],
+        )
+
+    def fetch(self, query: str, params: List[Any]) -> List[Dict[str, Any]]:
+        """Run a query of event rows and decode them.
+
+        Args:
+            query (str): Query selecting the data column
+            params (List[Any]): Query params
+
+        Returns:
+            List[Dict[str, Any]]: Dict events, or nothing if there is no database yet
+        """
+        if not self.path.exists():
+            return []
+        conn = self.connect(read_only=True)
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        return [self.serializer.load_event(data.encode()) for (data,) in rows]
@@ -11,6 +11,31 @@ GENERAL_PARAMS = {
     "single_events": True,
     "notification_sound": True,
     "notification_sound_path": ROOT_DIR / "resources" / "pop.wav",
+    "fetch_workers": 1,
+    "incremental_sync": False,
+    "fetch_engine": "threads",
+    "fetch_concurrency": 64,
+    "fetch_timeout": 30.0,
+    "stream_events": False,
+    "fields": [
+        "summary",
+        "start",
+        "end",
+        "reminders",
+        "colorId",
+        "description",
+        "hangoutLink",
+    ],
+    "expand_recurrence": False,
+    "batch_requests": False,
+    "rate_limit": 600.0,
+    "max_retries": 5,
+    "cache_format": "json",
+    "cache_backend": "files",
+    "extra_fields": [],
+    "fetch_horizon": 0,
+    "cache_compression": "none",
+    "daemon_poll_interval": 30.0,
 }
 
 CMD = "notify-send -u critical -a GoogleCalendar {calendar} {title}"
@@ -1,16 +1,59 @@
 #!/usr/bin/env python
-from datetime import datetime
-from typing import Any, Dict, Tuple
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
 
+from gcal_notifier.async_getter import AsyncGCalendarGetter
 from gcal_notifier.cli import cli
 from gcal_notifier.config_reader import init_config
+from gcal_notifier.event_daemon import ReminderDaemon
 from gcal_notifier.event_getter import SimpleGCalendarGetter
-from gcal_notifier.event_loader import load_saved_events
+from gcal_notifier.event_loader import (
+    load_events_db,
+    load_events_shards,
+    load_reminders,
+    load_reminders_db,
+    load_saved_events,
+)
 from gcal_notifier.event_printer import SimpleGCalendarPrinter
 from gcal_notifier.event_reminder import SimpleGCalendarNotifier
-from gcal_notifier.event_saver import save_events
+from gcal_notifier.event_saver import (
+    date_to_datetime,
+    merge_events,
+    period_filter,
+    save_events_db,
+    save_events_shards,
+    save_events_stream,
+    save_json_events,
+    transform_events,
+)
+from gcal_notifier.event_shards import MANIFEST
 from gcal_notifier.globals import CACHE
-from gcal_notifier.utils import define_period
+from gcal_notifier.serializers import CachedEvent
+from gcal_notifier.utils import define_period, merge_periods
+
+
+def sorted_events(
+    getter: SimpleGCalendarGetter, general_params: Dict[str, Any]
+) -> Iterable[Dict[str, Any]]:
+    """Dict events of the fetched calendars, sorted by start.
+
+    The calendars are already sorted by start when ordered by startTime or
+    expanded locally, so they are merged instead of sorted again.
+
+    Args:
+        getter (SimpleGCalendarGetter): Getter with the calendars loaded
+        general_params (Dict[str, Any]): General params
+
+    Returns:
+        Iterable[Dict[str, Any]]: Sorted dict events
+    """
+    if general_params["order_by"] == "startTime" or general_params["expand_recurrence"]:
+        return merge_events(getter.stream_events(), general_params["extra_fields"])
+    getter.load_events()
+    return transform_events(getter.events, general_params["extra_fields"])
 
 
 def run_getter(
@@ -23,15 +66,69 @@ def run_getter(
         general_params (Dict[str, Any]): General params
         calendar_params (Dict[str, Any]): Calendar params
     """
-    getter = SimpleGCalendarGetter(general_params, calendar_params)
+    if general_params["fetch_engine"] == "asyncio":
+        getter = AsyncGCalendarGetter(general_params, calendar_params)
+    else:
+        getter = SimpleGCalendarGetter(general_params, calendar_params)
+    notify_period = define_period("day")
+    print_period = define_period("month")
 
-    getter.load_calendars(define_period("day"))
-    getter.load_events()
-    save_events(getter.events, file_path=CACHE / "events_notify.json")
+    period = merge_periods(notify_period, print_period)
+    if general_params["fetch_horizon"]:
+        today = notify_period[0]
+        period = merge_periods(
+            period, (today, today + timedelta(days=general_params["fetch_horizon"]))
+        )
+    getter.load_calendars(period)
 
-    getter.load_calendars(define_period("month"))
-    getter.load_events()
-    save_events(getter.events, file_path=CACHE / "events_print.json")
+    if general_params["cache_backend"] == "sqlite":
+        save_events_db(
+            chain.from_iterable(getter.stream_events()),
+            period,
+            extra_fields=general_params["extra_fields"],
+        )
+        return
+
+    if general_params["cache_backend"] == "shards":
+        save_events_shards(
+            sorted_events(getter, general_params),
+            period,
+            general_params["cache_format"],
+            compression=general_params["cache_compression"],
+        )
+        return
+
+    if general_params["stream_events"] and general_params["order_by"] == "startTime":
+        save_events_stream(
+            getter.stream_events(),
+            {
+                CACHE / "events_notify.json": notify_period,
+                CACHE / "events_print.json": print_period,
+            },
+            general_params["cache_format"],
+            indexed_files=[CACHE / "events_notify.json", CACHE / "events_print.json"],
+            extra_fields=general_params["extra_fields"],
+            compression=general_params["cache_compression"],
+            compressed_files=[CACHE / "events_print.json"],
+        )
+        return
+
+    json_events = list(sorted_events(getter, general_params))
+    in_period = period_filter(notify_period)
+    save_json_events(
+        [event for event in json_events if in_period(event)],
+        file_path=CACHE / "events_notify.json",
+        cache_format=general_params["cache_format"],
+        reminder_index=True,
+    )
+    in_period = period_filter(print_period)
+    save_json_events(
+        [event for event in json_events if in_period(event)],
+        file_path=CACHE / "events_print.json",
+        cache_format=general_params["cache_format"],
+        reminder_index=True,
+        compression=general_params["cache_compression"],
+    )
 
 
 def run_notifier(general_params: Dict[str, Any], calendar_params: Dict[str, Any]) -> None:
@@ -41,9 +138,77 @@ def run_notifier(general_params: Dict[str, Any], calendar_params: Dict[str, Any]
         general_params (Dict[str, Any]): General params
         calendar_params (Dict[str, Any]): Calendar params
     """
-    saved_events = load_saved_events(CACHE / "events_notify.json")
+    now = datetime.now().astimezone()
+    if general_params["cache_backend"] == "sqlite":
+        saved_events = load_reminders_db(now)
+    elif general_params["cache_backend"] == "shards":
+        saved_events = load_events_shards((now.date(), now.date() + timedelta(days=1)))
+    else:
+        saved_events = load_reminders(CACHE / "events_notify.json", now)
+    if saved_events is None:
+        saved_events = load_saved_events(
+            CACHE / "events_notify.json", start=now - timedelta(minutes=1)
+        )
     notifier = SimpleGCalendarNotifier(saved_events, general_params, calendar_params)
-    notifier.search_reminders()
+    notifier.search_reminders(now)
+
+
+def load_daemon_events(general_params: Dict[str, Any], since: datetime) -> List[CachedEvent]:
+    """Load the events the daemon reminds, from the configured cache backend.
+
+    sqlite and shards keep more than a day, so only the events of the day
+    of since and of the two days after it are loaded; the daemon loads
+    them again when the day changes.
+
+    Args:
+        general_params (Dict[str, Any]): General params
+        since (datetime): Time from which reminders are still to fire, aware
+
+    Returns:
+        List[CachedEvent]: Events that end after since
+    """
+    last_day = since.date() + timedelta(days=2)
+    if general_params["cache_backend"] == "sqlite":
+        return load_events_db((since, date_to_datetime(last_day + timedelta(days=1))))
+    if general_params["cache_backend"] == "shards":
+        return load_events_shards((since.date(), last_day))
+    return load_saved_events(CACHE / "events_notify.json", start=since)
+
+
+def daemon_cache_files(general_params: Dict[str, Any]) -> List[Path]:
+    """Files that get writes to the configured cache backend.
+
+    Args:
+        general_params (Dict[str, Any]): General params
+
+    Returns:
+        List[Path]: Files the daemon watches
+    """
+    if general_params["cache_backend"] == "sqlite":
+        return [CACHE / "events.db", CACHE / "events.db-wal"]
+    if general_params["cache_backend"] == "shards":
+        return [CACHE / "shards" / MANIFEST]
+    return [CACHE / "events_notify.json"]
+
+
+def run_daemon(general_params: Dict[str, Any], calendar_params: Dict[str, Any]) -> None:
+    """Run ReminderDaemon with user configs, until interrupted.
+
+    Args:
+        general_params (Dict[str, Any]): General params
+        calendar_params (Dict[str, Any]): Calendar params
+    """
+    daemon = ReminderDaemon(
+        general_params,
+        calendar_params,
+        partial(load_daemon_events, general_params),
+        daemon_cache_files(general_params),
+        general_params["daemon_poll_interval"],
+    )
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
 
 
 def run_printer(
@@ -59,7 +224,19 @@ def run_printer(
         calendar_params (Dict[str, Any]): Calendar params
         format (str): Format to use when printing events
     """
-    saved_events = load_saved_events(CACHE / "events_print.json")
+    time_min, time_max = period
+    if general_params["cache_backend"] == "sqlite":
+        saved_events = load_events_db(
+            (date_to_datetime(time_min), date_to_datetime(time_max + timedelta(days=1)))
+        )
+    elif general_params["cache_backend"] == "shards":
+        saved_events = load_events_shards(period)
+    else:
+        saved_events = load_saved_events(
+            CACHE / "events_print.json",
+            datetime.now().astimezone() if format == "next" else date_to_datetime(time_min),
+            date_to_datetime(time_max + timedelta(days=1)),
+        )
     printer = SimpleGCalendarPrinter(
         saved_events, general_params, calendar_params, period, format=format
     )
@@ -76,6 +253,8 @@ def gcal_notifier() -> None:
         run_getter(general_params, calendar_params)
     elif args.command == "notify":
         run_notifier(general_params, calendar_params)
+    elif args.command == "daemon":
+        run_daemon(general_params, calendar_params)
     elif args.command == "print":
         period = define_period(args.period)
         fmt = args.period if args.period != "next" else "next"
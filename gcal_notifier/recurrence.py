@@ -0,0 +1,182 @@
+from copy import copy, deepcopy
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+from dateutil.parser import isoparse
+from dateutil.rrule import rruleset, rrulestr
+from gcsa.event import Event
+from gcsa.serializers.event_serializer import EventSerializer
+from zoneinfo import ZoneInfo
+
+from gcal_notifier.event_saver import date_to_datetime
+
+EXPANSION_FIELDS = ["recurrence", "recurringEventId", "originalStartTime"]
+
+
+def parse_ical_dates(line: str, dtstart: datetime) -> List[datetime]:
+    """Parse the dates of an EXDATE or RDATE line.
+
+    Args:
+        line (str): Line, e.g. "EXDATE;TZID=Europe/Berlin:20211026T100000"
+        dtstart (datetime): Start of the recurring event
+
+    Returns:
+        List[datetime]: Dates, in the same form as dtstart
+    """
+    name_params, _, values = line.partition(":")
+    params = dict(param.split("=", 1) for param in name_params.split(";")[1:])
+    tzinfo = ZoneInfo(params["TZID"]) if "TZID" in params else dtstart.tzinfo
+
+    dates = []
+    for value in values.split(","):
+        if "T" not in value:
+            day = datetime.strptime(value, "%Y%m%d").date()
+            dates.append(datetime.combine(day, dtstart.timetz()))
+        elif value.endswith("Z"):
+            dates.append(
+                datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+            )
+        else:
+            dates.append(datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=tzinfo))
+
+    if dtstart.tzinfo is None:
+        dates = [value.replace(tzinfo=None) for value in dates]
+    return dates
+
+
+def build_ruleset(recurrence: List[str], dtstart: datetime) -> rruleset:
+    """Build the set of occurrences of a recurring event.
+
+    Args:
+        recurrence (List[str]): RRULE, EXRULE, RDATE and EXDATE lines of the event
+        dtstart (datetime): Start of the recurring event
+
+    Returns:
+        rruleset: Occurrences of the event
+    """
+    rules = rruleset()
+    for line in recurrence:
+        name = line.split(":", 1)[0].split(";", 1)[0].upper()
+        if name == "RRULE":
+            rules.rrule(rrulestr(line, dtstart=dtstart))
+        elif name == "EXRULE":
+            rules.exrule(rrulestr(line.replace("EXRULE", "RRULE", 1), dtstart=dtstart))
+        elif name == "RDATE":
+            for value in parse_ical_dates(line, dtstart):
+                rules.rdate(value)
+        elif name == "EXDATE":
+            for value in parse_ical_dates(line, dtstart):
+                rules.exdate(value)
+    return rules
+
+
+def occurrence_key(value: Union[date, datetime]) -> Union[str, float]:
+    """Key that identifies an occurrence by its original start.
+
+    Args:
+        value (Union[date, datetime]): Start of the occurrence
+
+    Returns:
+        Union[str, float]: ISO date for all-day occurrences, timestamp otherwise
+    """
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value.isoformat()
+
+
+def original_start(original_start_time: Dict[str, str]) -> Union[date, datetime]:
+    """Original start of an exception of a recurring event.
+
+    Args:
+        original_start_time (Dict[str, str]): originalStartTime of the exception
+
+    Returns:
+        Union[date, datetime]: Date for all-day events, datetime otherwise
+    """
+    if "date" in original_start_time:
+        return date.fromisoformat(original_start_time["date"])
+    return isoparse(original_start_time["dateTime"])
+
+
+def expand_event(
+    item: Dict[str, Any],
+    window: Tuple[datetime, datetime],
+    skipped: Set[Tuple[str, Union[str, float]]],
+) -> Iterator[Event]:
+    """Expand a recurring event into its occurrences inside a window.
+
+    The occurrences are shallow copies of the recurring event, so they share
+    its attendees, reminders and other data instead of carrying a full copy.
+
+    Args:
+        item (Dict[str, Any]): Raw recurring event
+        window (Tuple[datetime, datetime]): (Start datetime, End datetime)
+        skipped (Set[Tuple[str, Union[str, float]]]): Occurrences replaced by
+            exceptions, as (recurringEventId, occurrence_key)
+
+    Yields:
+        Event: Occurrence of the event
+    """
+    master = EventSerializer.to_object(deepcopy(item))
+    duration = master.end - master.start
+    all_day = not isinstance(master.start, datetime)
+
+    if all_day:
+        dtstart = datetime.combine(master.start, time())
+        time_min, time_max = (value.replace(tzinfo=None) for value in window)
+    else:
+        tz_name = item["start"].get("timeZone")
+        dtstart = master.start.astimezone(ZoneInfo(tz_name)) if tz_name else master.start
+        time_min, time_max = window
+
+    rules = build_ruleset(master.recurrence, dtstart)
+    for start in rules.between(time_min - max(duration, timedelta(0)), time_max, inc=True):
+        if all_day:
+            start = start.date()
+            suffix = start.strftime("%Y%m%d")
+        else:
+            suffix = start.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        if (master.event_id, occurrence_key(start)) in skipped:
+            continue
+
+        occurrence = copy(master)
+        occurrence.start = start
+        occurrence.end = start + duration
+        occurrence.event_id = f"{master.event_id}_{suffix}"
+        occurrence.recurring_event_id = master.event_id
+        occurrence.recurrence = []
+        yield occurrence
+
+
+def expand_items(items: Iterable[Dict[str, Any]], period: Tuple[date, date]) -> List[Event]:
+    """Turn raw events fetched with single_events disabled into single events.
+
+    Recurring events are expanded locally from their RRULE, EXDATE and RDATE
+    lines. Modified exceptions replace their original occurrence and
+    cancelled ones remove it.
+
+    Args:
+        items (Iterable[Dict[str, Any]]): Raw events, exceptions and recurring events
+        period (Tuple[date, date]): (Start date, End date)
+
+    Returns:
+        List[Event]: Single events and occurrences, not sorted
+    """
+    window = (date_to_datetime(period[0]), date_to_datetime(period[1]))
+    events = []
+    recurring = []
+    skipped = set()
+    for item in items:
+        if item.get("recurringEventId") and "originalStartTime" in item:
+            start = original_start(item["originalStartTime"])
+            skipped.add((item["recurringEventId"], occurrence_key(start)))
+        if item.get("status") == "cancelled":
+            continue
+        if item.get("recurrence"):
+            recurring.append(item)
+        else:
+            events.append(EventSerializer.to_object(deepcopy(item)))
+
+    for item in recurring:
+        events.extend(expand_event(item, window, skipped))
+    return events
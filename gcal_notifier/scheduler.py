@@ -0,0 +1,282 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+RATE_LIMIT_REASONS = (b"rateLimitExceeded", b"userRateLimitExceeded")
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking.
+
+    Args:
+        rate (float): Tokens added per second, 0 for no limit
+        capacity (float): Maximum number of stored tokens
+
+    Attributes:
+        rate (float): Tokens added per second
+        capacity (float): Maximum number of stored tokens
+        tokens (float): Stored tokens, negative when reserved ahead
+        updated (float): Monotonic time of the last refill
+        paused_until (float): Monotonic time before which no reservation is
+            usable, whatever the rate
+    """
+
+    rate: float
+    capacity: float
+    tokens: float
+    updated: float
+    paused_until: float
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, cost: float = 1) -> float:
+        """Take tokens, possibly ahead of time.
+
+        Args:
+            cost (float): Number of tokens
+
+        Returns:
+            float: Seconds to wait before using them
+        """
+        with self._lock:
+            wait = self.paused_until - time.monotonic()
+            if self.rate > 0:
+                self.refill()
+                self.tokens -= cost
+                wait = max(wait, -self.tokens / self.rate)
+            return max(0.0, wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back the next reservations for some time.
+
+        Args:
+            seconds (float): Seconds without tokens
+        """
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            if self.rate > 0:
+                self.refill()
+                self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class RequestScheduler:
+    """Paces the requests of each account and retries throttled ones.
+
+    Every account has its own token bucket, so waiting for the quota of a
+    busy account never delays the requests of the others. Throttled requests
+    (429, or 403 rateLimitExceeded) pause the bucket of their account for the
+    Retry-After time or an exponential backoff with full jitter, then are
+    sent again, up to max_retries times. Pauses hold even without a rate.
+
+    The asyncio engine waits without blocking anything else. With the
+    threads engine the wait is a sleep in the worker thread (see
+    ScheduledHttp), so a throttled account keeps its workers busy meanwhile,
+    and the calendars of other accounts queued behind them wait as well.
+
+    Args:
+        rate (float): Requests per minute of each account, 0 for no limit
+        max_retries (int): Maximum number of retries of a request
+        base_delay (float): First backoff delay, in seconds
+        max_delay (float): Maximum backoff delay, in seconds
+
+    Attributes:
+        buckets (Dict[Hashable, TokenBucket]): Token bucket of each account
+        requests (int): Number of requests sent
+        throttled (int): Number of throttled answers
+        retried (int): Number of requests sent again
+    """
+
+    buckets: Dict[Hashable, TokenBucket]
+    requests: int
+    throttled: int
+    retried: int
+
+    def __init__(
+        self,
+        rate: float = 600.0,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 64.0,
+    ) -> None:
+        self.rate = rate
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.buckets = {}
+        self.requests = 0
+        self.throttled = 0
+        self.retried = 0
+        self._lock = threading.Lock()
+
+    def bucket(self, account: Hashable) -> TokenBucket:
+        """Token bucket of an account.
+
+        Args:
+            account (Hashable): Account, e.g. its credentials path
+
+        Returns:
+            TokenBucket: Token bucket
+        """
+        with self._lock:
+            if account not in self.buckets:
+                self.buckets[account] = TokenBucket(self.rate / 60, max(self.rate, 1.0))
+            return self.buckets[account]
+
+    def reserve(self, account: Hashable, cost: int = 1) -> float:
+        """Reserve the quota of requests of an account.
+
+        Args:
+            account (Hashable): Account
+            cost (int): Number of API calls
+
+        Returns:
+            float: Seconds to wait before sending them
+        """
+        with self._lock:
+            self.requests += cost
+        return self.bucket(account).reserve(cost)
+
+    def acquire(self, account: Hashable, cost: int = 1) -> None:
+        """Wait until requests of an account can be sent.
+
+        Args:
+            account (Hashable): Account
+            cost (int): Number of API calls
+        """
+        time.sleep(self.reserve(account, cost))
+
+    async def acquire_async(self, account: Hashable, cost: int = 1) -> None:
+        """Wait until requests of an account can be sent, without blocking the loop.
+
+        Args:
+            account (Hashable): Account
+            cost (int): Number of API calls
+        """
+        await asyncio.sleep(self.reserve(account, cost))
+
+    @staticmethod
+    def is_rate_limited(status: int, content: bytes) -> bool:
+        """Check if an answer means the quota was exceeded.
+
+        Args:
+            status (int): HTTP status
+            content (bytes): Body of the answer
+
+        Returns:
+            bool: If the request was throttled
+        """
+        if isinstance(content, str):
+            content = content.encode()
+        return status == 429 or (
+            status == 403 and any(reason in content for reason in RATE_LIMIT_REASONS)
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Delay before retrying a throttled request.
+
+        Args:
+            attempt (int): Number of retries already made
+            retry_after (Optional[str]): Retry-After header, in seconds or as an HTTP date
+
+        Returns:
+            float: Seconds to wait
+        """
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def should_retry(
+        self,
+        account: Hashable,
+        attempt: int,
+        status: int,
+        content: bytes,
+        retry_after: Optional[str] = None,
+    ) -> bool:
+        """Handle an answer, pausing the account if it was throttled.
+
+        Args:
+            account (Hashable): Account
+            attempt (int): Number of retries already made
+            status (int): HTTP status
+            content (bytes): Body of the answer
+            retry_after (Optional[str]): Retry-After header
+
+        Returns:
+            bool: If the request has to be sent again
+        """
+        if not self.is_rate_limited(status, content):
+            return False
+        with self._lock:
+            self.throttled += 1
+            if attempt >= self.max_retries:
+                return False
+            self.retried += 1
+        self.bucket(account).pause(self.backoff(attempt, retry_after))
+        return True
+
+
+class ScheduledHttp:
+    """httplib2.Http wrapper that sends the requests through a RequestScheduler.
+
+    A batch request is charged one token per call it carries. The wait for
+    the quota happens in the calling thread, which holds its worker of the
+    fetch_workers pool while its account is throttled.
+
+    Args:
+        http (Any): Authorized httplib2.Http
+        scheduler (RequestScheduler): Scheduler of the requests
+        account (Hashable): Account of the requests
+    """
+
+    def __init__(self, http: Any, scheduler: RequestScheduler, account: Hashable) -> None:
+        self.http = http
+        self.scheduler = scheduler
+        self.account = account
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> Tuple[Any, bytes]:
+        """Send a request when the quota allows it, retrying it if throttled."""
+        cost = 1
+        if body and "multipart/mixed" in (headers or {}).get("content-type", ""):
+            cost = max(1, body.count("Content-ID:" if isinstance(body, str) else b"Content-ID:"))
+
+        attempt = 0
+        while True:
+            self.scheduler.acquire(self.account, cost)
+            resp, content = self.http.request(uri, method, body=body, headers=headers, **kwargs)
+            if not self.scheduler.should_retry(
+                self.account, attempt, resp.status, content, resp.get("retry-after")
+            ):
+                return resp, content
+            attempt += 1
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.http, name)
@@ -0,0 +1,949 @@
+import codecs
+import json
+import marshal
+import struct
+import textwrap
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+HEADER_PREFIX = b"#gcal_notifier:"
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S%z"
+
+DATETIME_FIELDS = ("start", "end")
+
+RECORD_SIZE = struct.Struct("<I")
+
+CACHED_FIELDS = (
+    "event_id",
+    "cal_code",
+    "calendar",
+    "summary",
+    "description",
+    "start",
+    "end",
+    "color_id",
+    "reminders",
+    "other",
+)
+
+EPOCH_FIELDS = ("utc_offset", "end_offset")
+
+TABLE_COUNTS = struct.Struct("<II")
+
+TABLE_EVENT = struct.Struct("<qqqiiII")
+
+TABLE_REMINDER = struct.Struct("<qIi")
+
+
+def str_to_datetime(date_str: str) -> datetime:
+    """String to datetime.
+
+    Args:
+        date_str (str): date_str
+
+    Returns:
+        datetime: Datetime object
+    """
+    return datetime.strptime(date_str, DATETIME_FORMAT)
+
+
+def to_isoformat(o: Any) -> str:
+    """Default encoder of the values without a native type in compact formats.
+
+    Args:
+        o (Any): Value
+
+    Returns:
+        str: ISO format of dates and datetimes, str of anything else
+    """
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    return str(o)
+
+
+def to_plain(value: Any) -> Any:
+    """Convert a value to dicts, lists and scalars only.
+
+    Args:
+        value (Any): Value
+
+    Returns:
+        Any: Value with dates, datetimes and objects turned into strings
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(v) for v in value]
+    return to_isoformat(value)
+
+
+def parse_isoformat(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turn the ISO format start and end of dict events into datetimes.
+
+    Args:
+        events (List[Dict[str, Any]]): Dict events
+
+    Returns:
+        List[Dict[str, Any]]: The same events
+    """
+    fromisoformat = datetime.fromisoformat
+    for event in events:
+        for att in DATETIME_FIELDS:
+            event[att] = fromisoformat(event[att])
+    return events
+
+
+def event_timestamp(event: Dict[str, Any], key: str = "start") -> float:
+    """Epoch seconds of the start or end of a dict event, without building datetimes.
+
+    Args:
+        event (Dict[str, Any]): Dict event
+        key (str): "start" or "end"
+
+    Returns:
+        float: Epoch seconds
+    """
+    if isinstance(event, (CachedEvent, EpochEvent, LazyEvent)):
+        return event.timestamp(key)
+    return event[key].timestamp()
+
+
+class EpochEvent(dict):
+    """Dict event loaded with epoch start and end.
+
+    The datetimes are only built, and then kept, when start or end are
+    read, so code that only compares times can use event_timestamp.
+    """
+
+    def __getitem__(self, key: str) -> Any:
+        value = dict.__getitem__(self, key)
+        if key in DATETIME_FIELDS and isinstance(value, int):
+            offset = dict.get(self, f"{key}_offset", dict.get(self, "utc_offset", 0))
+            value = datetime.fromtimestamp(value, timezone(timedelta(seconds=offset)))
+            self[key] = value
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def timestamp(self, key: str = "start") -> float:
+        """Epoch seconds of the start or end.
+
+        Args:
+            key (str): "start" or "end"
+
+        Returns:
+            float: Epoch seconds
+        """
+        value = dict.__getitem__(self, key)
+        return value if isinstance(value, int) else value.timestamp()
+
+
+class CachedEvent(Mapping):
+    """Event loaded from the cache, with a slot per field read by notify and print.
+
+    It takes a fraction of the memory of a dict event and its fields are
+    read as attributes. Extra fields, see extra_fields, are kept in extra.
+    It is also a read-only mapping of all its fields, for the notification
+    command and for code written for dict events.
+
+    Like on an EpochEvent, start and end can be kept as epoch seconds and
+    a UTC offset, and their datetimes are only built, and then kept, when
+    they are read, so code that only compares times can use event_timestamp.
+
+    Attributes:
+        extra (Optional[Dict[str, Any]]): Extra fields, if any
+    """
+
+    __slots__ = (
+        *(field for field in CACHED_FIELDS if field not in DATETIME_FIELDS),
+        "extra",
+        "_start",
+        "_end",
+        "_start_offset",
+        "_end_offset",
+    )
+
+    event_id: str
+    cal_code: str
+    calendar: str
+    summary: str
+    description: Optional[str]
+    color_id: Optional[str]
+    reminders: List[int]
+    other: Dict[str, Any]
+    extra: Optional[Dict[str, Any]]
+
+    def __init__(
+        self,
+        event_id: str,
+        cal_code: str,
+        calendar: str,
+        summary: str,
+        description: Optional[str],
+        start: Union[datetime, int],
+        end: Union[datetime, int],
+        color_id: Optional[str] = None,
+        reminders: Optional[List[int]] = None,
+        other: Optional[Dict[str, Any]] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        start_offset: int = 0,
+        end_offset: int = 0,
+    ) -> None:
+        self.event_id = event_id
+        self.cal_code = cal_code
+        self.calendar = calendar
+        self.summary = summary
+        self.description = description
+        self._start = start
+        self._end = end
+        self._start_offset = start_offset
+        self._end_offset = end_offset
+        self.color_id = color_id
+        self.reminders = reminders or []
+        self.other = other or {}
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, event: Dict[str, Any]) -> "CachedEvent":
+        """Build from a dict event, as decoded by a serializer.
+
+        The values are read with dict.get, so the epoch start and end of an
+        EpochEvent are kept as they are.
+
+        Args:
+            event (Dict[str, Any]): Dict event, with datetime or epoch start and end
+
+        Returns:
+            CachedEvent: Event
+        """
+        extra = {
+            key: value
+            for key, value in dict.items(event)
+            if key not in CACHED_FIELD_SET and key not in EPOCH_FIELDS
+        }
+        utc_offset = dict.get(event, "utc_offset", 0)
+        return cls(
+            *(dict.get(event, field) for field in CACHED_FIELDS),
+            extra,
+            utc_offset,
+            dict.get(event, "end_offset", utc_offset),
+        )
+
+    @property
+    def start(self) -> datetime:
+        """Start of the event."""
+        if isinstance(self._start, int):
+            self._start = datetime.fromtimestamp(
+                self._start, timezone(timedelta(seconds=self._start_offset))
+            )
+        return self._start
+
+    @property
+    def end(self) -> datetime:
+        """End of the event."""
+        if isinstance(self._end, int):
+            self._end = datetime.fromtimestamp(
+                self._end, timezone(timedelta(seconds=self._end_offset))
+            )
+        return self._end
+
+    def timestamp(self, key: str = "start") -> float:
+        """Epoch seconds of the start or end.
+
+        Args:
+            key (str): "start" or "end"
+
+        Returns:
+            float: Epoch seconds
+        """
+        value = self._start if key == "start" else self._end
+        return value if isinstance(value, int) else value.timestamp()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in CACHED_FIELD_SET:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from CACHED_FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(CACHED_FIELDS) + len(self.extra or ())
+
+    def __repr__(self) -> str:
+        return f"CachedEvent({dict(self)!r})"
+
+
+CACHED_FIELD_SET = frozenset(CACHED_FIELDS)
+
+
+class LazyEvent(Mapping):
+    """Event read from a cache file, decoded on first access.
+
+    The start and end epoch seconds come from the index of the file, so
+    code that only compares times, with event_timestamp, decodes nothing.
+    Fields are read as items or attributes, like on a CachedEvent.
+
+    Args:
+        serializer (Serializer): Format of the record
+        record (bytes): Encoded event, see Serializer.load_event
+        start_epoch (int): Epoch seconds of the start
+        end_epoch (int): Epoch seconds of the end
+    """
+
+    def __init__(
+        self, serializer: "Serializer", record: bytes, start_epoch: int, end_epoch: int
+    ) -> None:
+        self.event: Optional[CachedEvent] = None
+        self.serializer = serializer
+        self.record = record
+        self.start_epoch = start_epoch
+        self.end_epoch = end_epoch
+
+    def decode(self) -> CachedEvent:
+        """Decode the event, once.
+
+        Returns:
+            CachedEvent: Event
+        """
+        if self.event is None:
+            self.event = CachedEvent.from_dict(self.serializer.load_event(self.record))
+            self.record = b""
+        return self.event
+
+    def __getattr__(self, name: str) -> Any:
+        if name in CACHED_FIELD_SET or name == "extra":
+            return getattr(self.decode(), name)
+        raise AttributeError(name)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.decode()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.decode())
+
+    def __len__(self) -> int:
+        return len(self.decode())
+
+    def timestamp(self, key: str = "start") -> float:
+        """Epoch seconds of the start or end.
+
+        Args:
+            key (str): "start" or "end"
+
+        Returns:
+            float: Epoch seconds
+        """
+        return self.start_epoch if key == "start" else self.end_epoch
+
+
+class DatetimeEncoder(json.JSONEncoder):
+    """Encoder for datetime objects."""
+
+    def default(self, o: Any) -> str:
+        try:
+            return json.JSONEncoder.default(self, o)
+        except TypeError:
+            if isinstance(o, datetime):
+                return o.strftime(DATETIME_FORMAT)
+            return str(o)
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Decode the items of a JSON array one at a time, as its content is read.
+
+    Only the current chunk and the item being decoded are kept in memory,
+    and nothing after the last item taken is read. A header line before
+    the array is skipped.
+
+    Args:
+        chunks (Iterable[bytes]): UTF-8 content of the file, in chunks of any size
+
+    Yields:
+        Any: Item of the array
+
+    Raises:
+        ValueError: The content is not a JSON array
+    """
+    decoder = json.JSONDecoder()
+    header = HEADER_PREFIX.decode()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    text = ""
+    pos = 0
+    started = False
+    ended = False
+
+    def read_more() -> bool:
+        nonlocal text, pos, ended
+        for chunk in chunks:
+            text = text[pos:] + utf8.decode(chunk)
+            pos = 0
+            return True
+        if not ended:
+            text = text[pos:] + utf8.decode(b"", final=True)
+            pos = 0
+            ended = True
+            return True
+        return False
+
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(text):
+            if not read_more():
+                raise ValueError("Unexpected end of the JSON array")
+            continue
+        if not started:
+            if len(text) - pos < len(HEADER_PREFIX) and header.startswith(text[pos:]):
+                if read_more():
+                    continue
+            if text.startswith(header, pos):
+                newline = text.find("\n", pos)
+                if newline < 0:
+                    if not read_more():
+                        raise ValueError("Unexpected end of the header")
+                    continue
+                pos = newline + 1
+                continue
+            if text[pos] != "[":
+                raise ValueError("The content is not a JSON array")
+            pos += 1
+            started = True
+            continue
+        if text[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            if not read_more():
+                raise
+            continue
+        if end == len(text) and not ended:
+            # A number could go on in the next chunk
+            if not read_more():
+                raise ValueError("Unexpected end of the JSON array")
+            continue
+        pos = end
+        yield item
+
+
+class Serializer(ABC):
+    """Format of the cache files.
+
+    Events are written one at a time, with dump_start, dump_event and
+    dump_end, so the same format works for whole lists and for streams.
+    Every format but the original JSON starts with a header naming it.
+
+    Attributes:
+        name (str): Name of the format, as set in cache_format
+        indexable (bool): If the files can have a ReminderIndex, which needs
+            dump_event to return the encoded event and load_event to decode it;
+            load_event of the other formats raises TypeError
+    """
+
+    name: str = ""
+    indexable: bool = True
+
+    @property
+    def header(self) -> bytes:
+        """Header written at the start of the files."""
+        return HEADER_PREFIX + self.name.encode() + b"\n"
+
+    def dump_start(self) -> bytes:
+        """Start of the file."""
+        return self.header
+
+    @abstractmethod
+    def dump_event(self, event: Dict[str, Any], index: int) -> bytes:
+        """Encode a dict event.
+
+        Args:
+            event (Dict[str, Any]): Dict event
+            index (int): Position of the event in the file
+
+        Returns:
+            bytes: Encoded event
+        """
+
+    def record_offset(self, index: int) -> int:  # noqa: ARG002
+        """Number of bytes before the event itself in the output of dump_event.
+
+        Args:
+            index (int): Position of the event in the file
+
+        Returns:
+            int: Size of the separator or prefix of the event
+        """
+        return 0
+
+    def dump_end(self, count: int) -> bytes:  # noqa: ARG002
+        """End of the file.
+
+        Args:
+            count (int): Number of events written
+
+        Returns:
+            bytes: End of the file
+        """
+        return b""
+
+    def dumps(self, events: Iterable[Dict[str, Any]]) -> bytes:
+        """Encode dict events.
+
+        Args:
+            events (Iterable[Dict[str, Any]]): Dict events sorted by start
+
+        Returns:
+            bytes: Content of the file
+        """
+        chunks = [self.dump_start()]
+        count = 0
+        for count, event in enumerate(events, 1):
+            chunks.append(self.dump_event(event, count - 1))
+        chunks.append(self.dump_end(count))
+        return b"".join(chunks)
+
+    @abstractmethod
+    def loads(self, data: bytes) -> List[Dict[str, Any]]:
+        """Decode dict events, with datetime start and end.
+
+        Args:
+            data (bytes): Content of the file
+
+        Returns:
+            List[Dict[str, Any]]: Dict events
+        """
+
+    def iter_loads(self, chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+        """Decode dict events one at a time, as the content of the file is read.
+
+        The JSON formats decode the events as the chunks come, so stopping
+        early stops reading. The others read the whole content first.
+
+        Args:
+            chunks (Iterable[bytes]): Content of the file, in chunks
+
+        Yields:
+            Dict[str, Any]: Dict event, with datetime start and end
+        """
+        yield from self.loads(b"".join(chunks))
+
+    @abstractmethod
+    def load_event(self, record: bytes) -> Dict[str, Any]:
+        """Decode a single event, read at an offset given by record_offset.
+
+        Args:
+            record (bytes): Encoded event, without separator or prefix
+
+        Returns:
+            Dict[str, Any]: Dict event, with datetime start and end
+
+        Raises:
+            TypeError: The format is not indexable, so it has no event records
+        """
+
+
+class JSONSerializer(Serializer):
+    """Original pretty printed JSON, without header."""
+
+    name = "json"
+
+    def dump_start(self) -> bytes:
+        return b"["
+
+    def dump_event(self, event: Dict[str, Any], index: int) -> bytes:
+        record = json.dumps(event, ensure_ascii=False, indent=4, cls=DatetimeEncoder)
+        return (("\n" if index == 0 else ",\n") + textwrap.indent(record, "    ")).encode()
+
+    def record_offset(self, index: int) -> int:
+        return 1 if index == 0 else 2
+
+    def dump_end(self, count: int) -> bytes:
+        return b"\n]" if count else b"]"
+
+    def dumps(self, events: Iterable[Dict[str, Any]]) -> bytes:
+        content = json.dumps(list(events), ensure_ascii=False, indent=4, cls=DatetimeEncoder)
+        return content.encode()
+
+    def loads(self, data: bytes) -> List[Dict[str, Any]]:
+        events = json.loads(data)
+        for event in events:
+            for att in DATETIME_FIELDS:
+                event[att] = str_to_datetime(event[att])
+        return events
+
+    def iter_loads(self, chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+        for event in iter_json_array(chunks):
+            for att in DATETIME_FIELDS:
+                event[att] = str_to_datetime(event[att])
+            yield event
+
+    def load_event(self, record: bytes) -> Dict[str, Any]:
+        event = json.loads(record)
+        for att in DATETIME_FIELDS:
+            event[att] = str_to_datetime(event[att])
+        return event
+
+
+class CompactJSONSerializer(Serializer):
+    """JSON without indentation, with ISO format datetimes."""
+
+    name = "compact_json"
+
+    def dump_start(self) -> bytes:
+        return self.header + b"["
+
+    def dump_event(self, event: Dict[str, Any], index: int) -> bytes:
+        record = json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=to_isoformat)
+        return (record if index == 0 else "," + record).encode()
+
+    def record_offset(self, index: int) -> int:
+        return 0 if index == 0 else 1
+
+    def dump_end(self, count: int) -> bytes:  # noqa: ARG002
+        return b"]"
+
+    def loads(self, data: bytes) -> List[Dict[str, Any]]:
+        return parse_isoformat(json.loads(data[len(self.header) :]))
+
+    def iter_loads(self, chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+        for event in iter_json_array(chunks):
+            yield parse_isoformat([event])[0]
+
+    def load_event(self, record: bytes) -> Dict[str, Any]:
+        return parse_isoformat([json.loads(record)])[0]
+
+
+class EpochSerializer(CompactJSONSerializer):
+    """JSON without indentation, with start and end as epoch seconds.
+
+    The UTC offset of the start is kept in utc_offset, and the one of the
+    end in end_offset when it differs. Loading builds no datetime at all,
+    see EpochEvent.
+    """
+
+    name = "epoch"
+
+    def dump_event(self, event: Dict[str, Any], index: int) -> bytes:
+        start, end = event["start"], event["end"]
+        utc_offset = int((start.utcoffset() or timedelta(0)).total_seconds())
+        end_offset = int((end.utcoffset() or timedelta(0)).total_seconds())
+        record = {
+            **event,
+            "start": int(start.timestamp()),
+            "end": int(end.timestamp()),
+            "utc_offset": utc_offset,
+        }
+        if end_offset != utc_offset:
+            record["end_offset"] = end_offset
+        return super().dump_event(record, index)
+
+    def loads(self, data: bytes) -> List[Dict[str, Any]]:
+        return list(map(EpochEvent, json.loads(data[len(self.header) :])))
+
+    def iter_loads(self, chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+        return map(EpochEvent, iter_json_array(chunks))
+
+    def load_event(self, record: bytes) -> Dict[str, Any]:
+        return EpochEvent(json.loads(record))
+
+
+class MsgpackSerializer(Serializer):
+    """Sequence of msgpack maps, with ISO format datetimes. Needs msgpack."""
+
+    name = "msgpack"
+
+    def dump_event(self, event: Dict[str, Any], index: int) -> bytes:  # noqa: ARG002
+        return msgpack.packb(event, default=to_isoformat)
+
+    def loads(self, data: bytes) -> List[Dict[str, Any]]:
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(data[len(self.header) :])
+        return parse_isoformat(list(unpacker))
+
+    def load_event(self, record: bytes) -> Dict[str, Any]:
+        return parse_isoformat([msgpack.unpackb(record, raw=False)])[0]
+
+
+class BinarySerializer(Serializer):
+    """Sequence of length prefixed marshal records, with ISO format datetimes."""
+
+    name = "binary"
+
+    def dump_event(self, event: Dict[str, Any], index: int) -> bytes:  # noqa: ARG002
+        record = marshal.dumps(to_plain(event))
+        return RECORD_SIZE.pack(len(record)) + record
+
+    def record_offset(self, index: int) -> int:  # noqa: ARG002
+        return RECORD_SIZE.size
+
+    def loads(self, data: bytes) -> List[Dict[str, Any]]:
+        view = memoryview(data)
+        loads = marshal.loads
+        events = []
+        offset = len(self.header)
+        while offset < len(view):
+            (size,) = RECORD_SIZE.unpack_from(view, offset)
+            offset += RECORD_SIZE.size
+            events.append(loads(view[offset : offset + size]))
+            offset += size
+        return parse_isoformat(events)
+
+    def load_event(self, record: bytes) -> Dict[str, Any]:
+        return parse_isoformat([marshal.loads(record)])[0]
+
+
+class IndexColumn:
+    """Field of an array of fixed size entries in a buffer, as a sequence for bisect.
+
+    Args:
+        buffer (Any): Bytes, memoryview or mmap
+        offset (int): Position of the array in the buffer
+        entry (struct.Struct): Layout of the entries
+        count (int): Number of entries
+        field (int): Position of the field in the entries
+    """
+
+    def __init__(
+        self, buffer: Any, offset: int, entry: struct.Struct, count: int, field: int = 0
+    ) -> None:
+        self.buffer = buffer
+        self.offset = offset
+        self.entry_struct = entry
+        self.count = count
+        self.field = field
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, num: int) -> int:
+        return self.entry(num)[self.field]
+
+    def entry(self, num: int) -> Tuple[Any, ...]:
+        """Whole entry of the array."""
+        return self.entry_struct.unpack_from(
+            self.buffer, self.offset + num * self.entry_struct.size
+        )
+
+
+class EventTable:
+    """Reader of the table format, in place, e.g. on a memory-mapped file.
+
+    Only the entries that are binary-searched and the events returned are
+    read from the buffer, so a lookup touches a few pages of the file.
+
+    Args:
+        buffer (Any): Content of the file, as bytes, memoryview or mmap
+
+    Attributes:
+        starts (IndexColumn): Start of the events, in epoch seconds
+        max_ends (IndexColumn): Latest end of the events so far
+        fire_times (IndexColumn): Fire time of the reminders, in epoch seconds
+    """
+
+    starts: IndexColumn
+    max_ends: IndexColumn
+    fire_times: IndexColumn
+
+    def __init__(self, buffer: Any) -> None:
+        self.buffer = buffer
+        offset = len(TableSerializer().header)
+        events, reminders = TABLE_COUNTS.unpack_from(buffer, offset)
+        offset += TABLE_COUNTS.size
+        self.starts = IndexColumn(buffer, offset, TABLE_EVENT, events)
+        self.max_ends = IndexColumn(buffer, offset, TABLE_EVENT, events, field=2)
+        offset += events * TABLE_EVENT.size
+        self.fire_times = IndexColumn(buffer, offset, TABLE_REMINDER, reminders)
+        self.strings = offset + reminders * TABLE_REMINDER.size
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def event(self, num: int) -> EpochEvent:
+        """Decode an event.
+
+        Args:
+            num (int): Position of the event
+
+        Returns:
+            EpochEvent: Dict event
+        """
+        start, end, _, utc_offset, end_offset, offset, length = self.starts.entry(num)
+        offset += self.strings
+        event = EpochEvent(json.loads(bytes(self.buffer[offset : offset + length])))
+        event.update(start=start, end=end, utc_offset=utc_offset)
+        if end_offset != utc_offset:
+            event["end_offset"] = end_offset
+        return event
+
+    def between(self, time_min: float, time_max: float) -> List[Dict[str, Any]]:
+        """Events that overlap a time window.
+
+        Args:
+            time_min (float): Start of the window, in epoch seconds
+            time_max (float): End of the window, in epoch seconds
+
+        Returns:
+            List[Dict[str, Any]]: Dict events, sorted by start
+        """
+        first = bisect_right(self.max_ends, time_min)
+        last = bisect_left(self.starts, time_max, lo=first)
+        return [
+            self.event(num) for num in range(first, last) if self.starts.entry(num)[1] > time_min
+        ]
+
+    def reminders_between(self, time_min: float, time_max: float) -> List[Dict[str, Any]]:
+        """Events with a reminder that fires in a time window.
+
+        Args:
+            time_min (float): Start of the window, excluded
+            time_max (float): End of the window, included
+
+        Returns:
+            List[Dict[str, Any]]: Dict events, sorted by start
+        """
+        first = bisect_right(self.fire_times, time_min)
+        last = bisect_right(self.fire_times, time_max, lo=first)
+        nums = sorted({self.fire_times.entry(num)[1] for num in range(first, last)})
+        return [self.event(num) for num in nums]
+
+
+class TableSerializer(Serializer):
+    """Fixed layout binary table, read in place with mmap by notify and print.
+
+    After the header and the counts come an array of (start, end,
+    max_end, utc_offset, end_offset, offset, length) entries sorted by
+    start, an array of (fire_time, event, minutes_before) entries sorted by
+    fire time, and a string table with the other fields of each event as
+    compact JSON, located by offset and length. See EventTable.
+
+    The file is built whole, so streamed events are kept until dump_end.
+    """
+
+    name = "table"
+    indexable = False
+
+    def __init__(self) -> None:
+        self.pending: List[Dict[str, Any]] = []
+
+    def dump_start(self) -> bytes:
+        self.pending = []
+        return b""
+
+    def dump_event(self, event: Dict[str, Any], index: int) -> bytes:  # noqa: ARG002
+        self.pending.append(event)
+        return b""
+
+    def dump_end(self, count: int) -> bytes:  # noqa: ARG002
+        events, self.pending = self.pending, []
+        return self.dumps(events)
+
+    def dumps(self, events: Iterable[Dict[str, Any]]) -> bytes:
+        rows = []
+        reminders = []
+        strings = bytearray()
+        max_end = float("-inf")
+        for num, event in enumerate(events):
+            start, end = event["start"], event["end"]
+            fields = {key: value for key, value in event.items() if key not in DATETIME_FIELDS}
+            record = json.dumps(
+                fields, ensure_ascii=False, separators=(",", ":"), default=to_isoformat
+            ).encode()
+            start_epoch, end_epoch = int(start.timestamp()), int(end.timestamp())
+            max_end = max(max_end, end_epoch)
+            rows.append(
+                TABLE_EVENT.pack(
+                    start_epoch,
+                    end_epoch,
+                    max_end,
+                    int((start.utcoffset() or timedelta(0)).total_seconds()),
+                    int((end.utcoffset() or timedelta(0)).total_seconds()),
+                    len(strings),
+                    len(record),
+                )
+            )
+            strings += record
+            for minutes in event.get("reminders") or []:
+                reminders.append((start_epoch - minutes * 60, num, minutes))
+        reminders.sort()
+        return b"".join(
+            [
+                self.header,
+                TABLE_COUNTS.pack(len(rows), len(reminders)),
+                *rows,
+                *(TABLE_REMINDER.pack(*reminder) for reminder in reminders),
+                bytes(strings),
+            ]
+        )
+
+    def loads(self, data: bytes) -> List[Dict[str, Any]]:
+        table = EventTable(memoryview(data))
+        return [table.event(num) for num in range(len(table))]
+
+    def load_event(self, record: bytes) -> Dict[str, Any]:  # noqa: ARG002
+        raise TypeError("table files have no separate event records, read them with EventTable")
+
+
+SERIALIZERS = {
+    serializer.name: serializer
+    for serializer in (
+        JSONSerializer,
+        CompactJSONSerializer,
+        EpochSerializer,
+        MsgpackSerializer,
+        BinarySerializer,
+        TableSerializer,
+    )
+}
+
+
+def get_serializer(name: str = "json") -> Serializer:
+    """Get the serializer of a cache format.
+
+    Args:
+        name (str): Name of the format
+
+    Returns:
+        Serializer: Serializer
+
+    Raises:
+        ValueError: Unknown format
+        ImportError: msgpack format without the msgpack package
+    """
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown cache_format {name!r}, use one of {', '.join(SERIALIZERS)}")
+    if name == "msgpack" and msgpack is None:
+        raise ImportError("cache_format = msgpack needs the msgpack package")
+    return SERIALIZERS[name]()
+
+
+def detect_serializer(data: bytes) -> Serializer:
+    """Get the serializer of a cache file from its header.
+
+    Args:
+        data (bytes): Content of the file
+
+    Returns:
+        Serializer: Serializer, the original JSON for files without header
+    """
+    name = "json"
+    if data.startswith(HEADER_PREFIX):
+        name = data[len(HEADER_PREFIX) : data.index(b"\n")].decode()
+    return get_serializer(name)
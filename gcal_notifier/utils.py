@@ -1,7 +1,7 @@
 import calendar
 import shlex
 import subprocess
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Tuple
 
@@ -88,3 +88,15 @@ def define_period(period: str = "day") -> Tuple[datetime, datetime]:
         time_max = today.replace(day=calendar.monthrange(today.year, today.month)[1])
 
     return time_min.date(), time_max.date()
+
+
+def merge_periods(*periods: Tuple[date, date]) -> Tuple[date, date]:
+    """Smallest period that covers all the given periods.
+
+    Args:
+        *periods (Tuple[date, date]): Periods as (Start date, End date)
+
+    Returns:
+        Tuple[date, date]: (Start date, End date)
+    """
+    return min(start for start, _ in periods), max(end for _, end in periods)
@@ -0,0 +1,495 @@
+"""Local stand-in for the Google Calendar v3 API, for tests and benchmarks."""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+EVENTS_PATH = "/calendar/v3/calendars/"
+BATCH_PATH = "/batch/calendar/v3"
+
+
+class FakeCalendarAPI:
+    """Serve generated calendars through the events list endpoint.
+
+    The server runs an asyncio loop in a background thread, so it can hold
+    thousands of keep-alive connections at once. Batches of list requests
+    are answered on the batch endpoint.
+
+    A share of the events can be daily recurring events. Like Google, the
+    server expands them into instances when singleEvents is true, and sends
+    the recurring event itself otherwise.
+
+    The last page of a list carries a nextSyncToken. A list with a syncToken
+    only sends the events changed since then (update_item, delete_item,
+    cancel_occurrence), deletions as cancelled events, and answers 410 Gone
+    once expire_sync_tokens was called.
+
+    Like Google, a list with a fields param only sends the selected fields,
+    see select_fields.
+
+    Args:
+        calendars (int): Number of calendars
+        events (int): Number of events per calendar
+        page_size (int): Maximum number of events per page
+        latency (float): Seconds to wait before answering each request
+        start (Optional[datetime]): Start of the first event. Defaults to today at midnight UTC
+        throttle (int): Number of first requests answered with 429 Too Many Requests
+        recurring (float): Share of the events that recur daily, from 0 to 1
+        occurrences (int): Number of occurrences of each recurring event
+        token (Optional[str]): Only access token accepted, any when None
+
+    Attributes:
+        items (Dict[str, List[Dict[str, Any]]]): Raw events of each calendar id
+        versions (Dict[str, int]): Change number of each event id, 0 for the generated ones
+        version (int): Number of the last change
+        generation (int): Generation of the sync tokens, bumped when they expire
+        queries (List[Dict[str, str]]): Query string params of each events list request
+        requests (int): Number of requests answered
+        bytes_sent (int): Number of body bytes sent
+        url (str): Base URL of the API, once started
+        batch_url (str): URL of the batch endpoint, once started
+    """
+
+    items: Dict[str, List[Dict[str, Any]]]
+    versions: Dict[str, int]
+    version: int
+    generation: int
+    queries: List[Dict[str, str]]
+    requests: int
+    bytes_sent: int
+    url: str
+    batch_url: str
+
+    def __init__(
+        self,
+        calendars: int = 3,
+        events: int = 20,
+        page_size: int = 250,
+        latency: float = 0.0,
+        start: Optional[datetime] = None,
+        throttle: int = 0,
+        recurring: float = 0.0,
+        occurrences: int = 30,
+        token: Optional[str] = None,
+    ) -> None:
+        self.page_size = page_size
+        self.token = token
+        self.throttle = throttle
+        self.recurring = recurring
+        self.occurrences = occurrences
+        self.latency = latency
+        self.start_time = start or datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        self.items = {
+            f"calendar{cal}@fake": [self.make_item(cal, num) for num in range(events)]
+            for cal in range(calendars)
+        }
+        self.versions = {}
+        self.version = 0
+        self.generation = 0
+        self.queries = []
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def make_item(self, cal: int, num: int) -> Dict[str, Any]:
+        """Raw event resource of a calendar.
+
+        Args:
+            cal (int): Index of the calendar
+            num (int): Index of the event in the calendar
+
+        Returns:
+            Dict[str, Any]: Event resource
+        """
+        start = self.start_time + timedelta(minutes=30 * num)
+        item = {
+            "kind": "calendar#event",
+            "id": f"c{cal}e{num}",
+            "status": "confirmed",
+            "summary": f"Event {num}",
+            "description": f"Description of event {num} of calendar {cal}",
+            "start": {"dateTime": start.isoformat(), "timeZone": "UTC"},
+            "end": {"dateTime": (start + timedelta(minutes=30)).isoformat(), "timeZone": "UTC"},
+            "reminders": {"useDefault": False, "overrides": [{"method": "popup", "minutes": 10}]},
+        }
+        if int((num + 1) * self.recurring) > int(num * self.recurring):
+            item["recurrence"] = [f"RRULE:FREQ=DAILY;COUNT={self.occurrences}"]
+        return item
+
+    def instances(self, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Instances of a recurring event, as sent with singleEvents.
+
+        Args:
+            item (Dict[str, Any]): Recurring event
+
+        Returns:
+            List[Dict[str, Any]]: Its instances
+        """
+        start = datetime.fromisoformat(item["start"]["dateTime"])
+        duration = datetime.fromisoformat(item["end"]["dateTime"]) - start
+        instances = []
+        for day in range(self.occurrences):
+            instance_start = start + timedelta(days=day)
+            instance = {k: v for k, v in item.items() if k != "recurrence"}
+            instance.update(
+                {
+                    "id": f"{item['id']}_{instance_start.strftime('%Y%m%dT%H%M%SZ')}",
+                    "recurringEventId": item["id"],
+                    "originalStartTime": {"dateTime": instance_start.isoformat()},
+                    "start": {"dateTime": instance_start.isoformat(), "timeZone": "UTC"},
+                    "end": {
+                        "dateTime": (instance_start + duration).isoformat(),
+                        "timeZone": "UTC",
+                    },
+                }
+            )
+            instances.append(instance)
+        return instances
+
+    def update_item(self, calendar_id: str, item: Dict[str, Any]) -> None:
+        """Add an event to a calendar, or replace the one with the same id.
+
+        Args:
+            calendar_id (str): Calendar id
+            item (Dict[str, Any]): Event resource
+        """
+        items = self.items[calendar_id]
+        for num, old_item in enumerate(items):
+            if old_item["id"] == item["id"]:
+                items[num] = item
+                break
+        else:
+            items.append(item)
+        self.version += 1
+        self.versions[item["id"]] = self.version
+
+    def delete_item(self, calendar_id: str, item_id: str) -> None:
+        """Delete an event, which is then sent as cancelled to syncs.
+
+        Args:
+            calendar_id (str): Calendar id
+            item_id (str): Event id
+        """
+        self.update_item(
+            calendar_id, {"kind": "calendar#event", "id": item_id, "status": "cancelled"}
+        )
+
+    def cancel_occurrence(self, calendar_id: str, item_id: str, day: int) -> None:
+        """Cancel one occurrence of a recurring event, adding a cancelled exception.
+
+        Args:
+            calendar_id (str): Calendar id
+            item_id (str): Recurring event id
+            day (int): Index of the occurrence
+        """
+        item = next(item for item in self.items[calendar_id] if item["id"] == item_id)
+        instance = self.instances(item)[day]
+        self.update_item(
+            calendar_id,
+            {
+                "kind": "calendar#event",
+                "id": instance["id"],
+                "status": "cancelled",
+                "recurringEventId": item_id,
+                "originalStartTime": instance["originalStartTime"],
+            },
+        )
+
+    def expire_sync_tokens(self) -> None:
+        """Make every sync token sent so far answer 410 Gone."""
+        self.generation += 1
+
+    @staticmethod
+    def start_of(item: Dict[str, Any]) -> datetime:
+        """Start of an event, or original start of a cancelled exception.
+
+        Args:
+            item (Dict[str, Any]): Event
+
+        Returns:
+            datetime: Start
+        """
+        return datetime.fromisoformat(item.get("start", item.get("originalStartTime"))["dateTime"])
+
+    @staticmethod
+    def parse_fields(fields: str) -> Dict[str, str]:
+        """Split a partial response selector into its top level fields.
+
+        Args:
+            fields (str): Selector, e.g. "nextPageToken,items(id,start)"
+
+        Returns:
+            Dict[str, str]: Selector of the subfields of each field, "" for the whole field
+        """
+        selection = {}
+        depth = 0
+        name = sub = ""
+        for char in fields + ",":
+            if char == "(":
+                depth += 1
+                if depth == 1:
+                    continue
+            elif char == ")":
+                depth -= 1
+                if depth == 0:
+                    continue
+            if depth:
+                sub += char
+            elif char == ",":
+                name, _, path = name.strip().partition("/")
+                selection[name] = path or sub
+                name = sub = ""
+            else:
+                name += char
+        return selection
+
+    @classmethod
+    def select_fields(cls, resource: Dict[str, Any], fields: str) -> Dict[str, Any]:
+        """Keep only the fields of a resource chosen by a partial response selector.
+
+        Args:
+            resource (Dict[str, Any]): Resource, e.g. the body of a list
+            fields (str): Selector
+
+        Returns:
+            Dict[str, Any]: Selected fields
+        """
+        selected = {}
+        for name, sub in cls.parse_fields(fields).items():
+            if name not in resource:
+                continue
+            value = resource[name]
+            if sub and isinstance(value, list):
+                value = [cls.select_fields(item, sub) for item in value]
+            elif sub:
+                value = cls.select_fields(value, sub)
+            selected[name] = value
+        return selected
+
+    @property
+    def calendar_params(self) -> Dict[str, Dict[str, Any]]:
+        """Calendar params pointing to every fake calendar."""
+        return {
+            f"CALENDAR{num}": {"name": calendar_id, "calendar": calendar_id}
+            for num, calendar_id in enumerate(self.items)
+        }
+
+    def list_events(self, calendar_id: str, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        """Answer an events list request.
+
+        Args:
+            calendar_id (str): Calendar id
+            query (Dict[str, str]): Query string params
+
+        Returns:
+            Tuple[int, Dict[str, Any]]: (Status, JSON body)
+        """
+        if calendar_id not in self.items:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+        self.queries.append(query)
+        items = self.items[calendar_id]
+        if "syncToken" in query:
+            generation, _, version = query["syncToken"].partition(".")
+            if int(generation) != self.generation:
+                return 410, {"error": {"code": 410, "message": "Sync token is no longer valid"}}
+            items = [i for i in items if self.versions.get(i["id"], 0) > int(version)]
+        else:
+            items = [i for i in items if i["status"] != "cancelled" or "recurringEventId" in i]
+
+        if query.get("singleEvents") == "true":
+            cancelled = {i["id"] for i in self.items[calendar_id] if i["status"] == "cancelled"}
+            items = [
+                instance
+                for item in items
+                for instance in (self.instances(item) if "recurrence" in item else [item])
+                if instance["id"] not in cancelled or instance is item
+            ]
+            if "syncToken" not in query:
+                items = [i for i in items if i["status"] != "cancelled"]
+                items.sort(key=self.start_of)
+        if "timeMin" in query:
+            time_min = datetime.fromisoformat(query["timeMin"])
+            items = [i for i in items if self.last_end(i) > time_min]
+        if "timeMax" in query:
+            time_max = datetime.fromisoformat(query["timeMax"])
+            items = [i for i in items if self.start_of(i) < time_max]
+
+        offset = int(query.get("pageToken", 0))
+        page_size = min(self.page_size, int(query.get("maxResults", self.page_size)))
+        body: Dict[str, Any] = {
+            "kind": "calendar#events",
+            "items": items[offset : offset + page_size],
+        }
+        if offset + page_size < len(items):
+            body["nextPageToken"] = str(offset + page_size)
+        else:
+            body["nextSyncToken"] = f"{self.generation}.{self.version}"
+        if "fields" in query:
+            body = self.select_fields(body, query["fields"])
+        return 200, body
+
+    def last_end(self, item: Dict[str, Any]) -> datetime:
+        """End of an event, or of the last occurrence of a recurring event.
+
+        Args:
+            item (Dict[str, Any]): Event
+
+        Returns:
+            datetime: End
+        """
+        if "end" not in item:
+            return self.start_of(item)
+        end = datetime.fromisoformat(item["end"]["dateTime"])
+        if "recurrence" in item:
+            end += timedelta(days=self.occurrences - 1)
+        return end
+
+    def route(
+        self, method: str, target: str, body: bytes, content_type: str
+    ) -> Tuple[int, str, bytes]:
+        """Answer a request.
+
+        Args:
+            method (str): HTTP method
+            target (str): Path and query string
+            body (bytes): Request body
+            content_type (str): Content-Type of the request
+
+        Returns:
+            Tuple[int, str, bytes]: (Status, Content-Type, Body)
+        """
+        parts = urlsplit(target)
+        if method == "POST" and parts.path == BATCH_PATH:
+            return self.batch(body, content_type)
+
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        if parts.path.startswith(EVENTS_PATH) and parts.path.endswith("/events"):
+            calendar_id = unquote(parts.path[len(EVENTS_PATH) : -len("/events")])
+            status, response = self.list_events(calendar_id, query)
+        else:
+            status, response = 404, {"error": {"code": 404, "message": "Not Found"}}
+        return status, "application/json; charset=UTF-8", json.dumps(response).encode()
+
+    def batch(self, body: bytes, content_type: str) -> Tuple[int, str, bytes]:
+        """Answer a multipart/mixed batch of GET requests.
+
+        Args:
+            body (bytes): Request body
+            content_type (str): Content-Type of the request, with its boundary
+
+        Returns:
+            Tuple[int, str, bytes]: (Status, Content-Type, Body)
+        """
+        message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        boundary = "batch_fake_boundary"
+        answer = []
+        for part in message.get_payload():
+            request_line = part.get_payload().lstrip().split("\n", 1)[0]
+            method, target, _ = request_line.split(" ", 2)
+            status, part_type, part_body = self.route(method, target, b"", "")
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            answer.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {part_type}\r\n"
+                f"Content-Length: {len(part_body)}\r\n\r\n"
+                f"{part_body.decode()}\r\n"
+            )
+        answer.append(f"--{boundary}--\r\n")
+        return 200, f"multipart/mixed; boundary={boundary}", "".join(answer).encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the requests of a keep-alive connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                method, target, _ = request_line.decode().split(" ", 2)
+                if self.requests < self.throttle:
+                    status, content_type = 429, "application/json; charset=UTF-8"
+                    payload = json.dumps(
+                        {"error": {"code": 429, "message": "Rate Limit Exceeded"}}
+                    ).encode()
+                elif self.token and headers.get("authorization") != f"Bearer {self.token}":
+                    status, content_type = 401, "application/json; charset=UTF-8"
+                    payload = json.dumps(
+                        {"error": {"code": 401, "message": "Invalid Credentials"}}
+                    ).encode()
+                else:
+                    status, content_type, payload = self.route(
+                        method, target, body, headers.get("content-type", "")
+                    )
+
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                self.requests += 1
+                self.bytes_sent += len(payload)
+                retry_after = "Retry-After: 0\r\n" if status == 429 else ""
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n{retry_after}"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def start(self) -> "FakeCalendarAPI":
+        """Start serving on a free localhost port."""
+        ready = threading.Event()
+
+        async def serve() -> None:
+            self._stopping = asyncio.Event()
+            server = await asyncio.start_server(self.handle, "127.0.0.1", 0, backlog=4096)
+            port = server.sockets[0].getsockname()[1]
+            self.url = f"http://127.0.0.1:{port}/calendar/v3"
+            self.batch_url = f"http://127.0.0.1:{port}{BATCH_PATH}"
+            ready.set()
+
+            await self._stopping.wait()
+            server.close()
+            handlers = asyncio.all_tasks() - {asyncio.current_task()}
+            for handler in handlers:
+                handler.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await server.wait_closed()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_until_complete, args=(serve(),), daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close all connections."""
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+    def __enter__(self) -> "FakeCalendarAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
@@ -0,0 +1,15 @@
+"""Events shared by the cache tests."""
+
+from datetime import datetime, timedelta, timezone
+
+from gcsa.event import Event
+
+START = datetime(2026, 10, 18, 9, tzinfo=timezone.utc)
+
+
+def make_events(count):
+    """Events an hour apart from START, with ids e0, e1..."""
+    return [
+        Event(f"Event {num}", start=START + timedelta(hours=num), event_id=f"e{num}")
+        for num in range(count)
+    ]
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+from gcal_notifier.event_daemon import ReminderDaemon
+from gcal_notifier.event_loader import load_saved_events
+from gcal_notifier.event_saver import save_events
+from gcal_notifier.serializers import CachedEvent
+from tests.sample_events import START, make_events
+
+NOTIFY_PARAMS = {"notification_sound": False, "notification_sound_path": None}
+
+
+def test_daemon_fires_reminders_once_and_rearms_on_save(tmp_path):
+    events = make_events(3)
+    for event in events:
+        event.reminders = [30, 10]
+    file_path = tmp_path / "events_notify.json"
+    save_events(events, file_path=file_path)
+    daemon = ReminderDaemon(
+        NOTIFY_PARAMS, {}, lambda now: load_saved_events(file_path, start=now), [file_path], 30.0
+    )
+    fired = []
+    daemon.notifier.notify = lambda event: fired.append(event.event_id)
+
+    now = START + timedelta(minutes=50) - timedelta(seconds=5)
+    daemon.arm(now)
+    assert not daemon.needs_arm(now)
+    assert daemon.timeout(now.timestamp()) == 5
+    daemon.fire_due(now.timestamp() + 4)
+    daemon.fire_due(now.timestamp() + 5)
+    assert fired == ["e1"]
+
+    events[2].reminders = [55, 30]
+    save_events(events, file_path=file_path)
+    now += timedelta(seconds=10)
+    assert daemon.needs_arm(now)
+    daemon.arm(now)
+    daemon.fire_due((START + timedelta(minutes=65)).timestamp())
+    assert fired == ["e1", "e2"]
+    daemon.fire_due((START + timedelta(minutes=92)).timestamp())
+    assert fired == ["e1", "e2"] and daemon.heap == []
+
+
+def test_daemon_fires_reminders_due_when_rearming(tmp_path):
+    midnight = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    cache_file = tmp_path / "events_notify.json"
+    cache_file.write_text("[]")
+    events = [
+        CachedEvent(
+            "e0",
+            "CAL",
+            "Cal",
+            "Event",
+            None,
+            midnight + timedelta(minutes=10),
+            midnight + timedelta(minutes=40),
+            reminders=[10],
+        ),
+        CachedEvent(
+            "e1",
+            "CAL",
+            "Cal",
+            "Event",
+            None,
+            midnight + timedelta(minutes=30),
+            midnight + timedelta(hours=1),
+            reminders=[10],
+        ),
+    ]
+    daemon = ReminderDaemon(NOTIFY_PARAMS, {}, lambda _since: events, [cache_file])
+    fired = []
+    daemon.notifier.notify = lambda event: fired.append(event.event_id)
+
+    assert daemon.tick(midnight - timedelta(seconds=10)) == 10
+    assert daemon.tick(midnight) == 30
+    assert fired == ["e0"]
+
+    cache_file.write_text("[ ]")
+    assert daemon.tick(midnight + timedelta(minutes=20)) == 30
+    assert fired == ["e0", "e1"]
+    daemon.tick(midnight + timedelta(minutes=21))
+    assert fired == ["e0", "e1"]
@@ -0,0 +1,317 @@
+import asyncio
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import chain
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from gcsa.google_calendar import GoogleCalendar
+from google.oauth2.credentials import Credentials
+
+from gcal_notifier import client_pool, event_getter, main
+from gcal_notifier.async_getter import AsyncGCalendarGetter
+from gcal_notifier.client_pool import GoogleCalendarPool
+from gcal_notifier.event_getter import SimpleGCalendarGetter
+from gcal_notifier.event_loader import load_saved_events
+from gcal_notifier.event_saver import period_filter, save_events
+from gcal_notifier.globals import GENERAL_PARAMS
+from gcal_notifier.scheduler import RequestScheduler
+from gcal_notifier.utils import define_period
+from tests.fake_calendar_api import FakeCalendarAPI
+
+PERIOD = (date.today() - timedelta(days=1), date.today() + timedelta(days=2))
+
+
+@pytest.fixture(autouse=True)
+def fake_token(monkeypatch):
+    monkeypatch.setattr(AsyncGCalendarGetter, "access_token", lambda *_: "token")
+    monkeypatch.setattr(
+        SimpleGCalendarGetter,
+        "make_conn",
+        staticmethod(
+            lambda calendar, _: GoogleCalendar(calendar, credentials=Credentials("token"))
+        ),
+    )
+
+
+def test_async_getter_follows_pages():
+    with FakeCalendarAPI(calendars=3, events=25, page_size=10) as api:
+        getter = AsyncGCalendarGetter({**GENERAL_PARAMS, "api_url": api.url}, api.calendar_params)
+        getter.load_calendars(PERIOD)
+        getter.load_events()
+
+    assert api.requests == 9
+    assert len(getter.events) == 75
+    assert list(getter.calendars) == list(api.calendar_params)
+    for cal_code, events in getter.calendars.items():
+        assert [e.event_id for e in events] == [f"c{cal_code[-1]}e{n}" for n in range(25)]
+    assert all(event.reminders == [10] for event in getter.events)
+
+
+def test_async_getter_times_out():
+    with FakeCalendarAPI(calendars=1, latency=0.5) as api:
+        getter = AsyncGCalendarGetter(
+            {**GENERAL_PARAMS, "api_url": api.url, "fetch_timeout": 0.1}, api.calendar_params
+        )
+        with pytest.raises(asyncio.TimeoutError):
+            getter.load_calendars(PERIOD)
+
+
+def test_async_getter_refreshes_expired_token(monkeypatch, caplog):
+    refreshed = []
+
+    def refresh_token(_getter, account):
+        refreshed.append(account)
+        return "new"
+
+    monkeypatch.setattr(AsyncGCalendarGetter, "access_token", lambda *_: "expired")
+    monkeypatch.setattr(AsyncGCalendarGetter, "refresh_token", refresh_token)
+    with FakeCalendarAPI(calendars=2, events=5, page_size=2, token="new") as api:
+        getter = AsyncGCalendarGetter(
+            {**GENERAL_PARAMS, "api_url": api.url, "incremental_sync": True}, api.calendar_params
+        )
+        getter.load_calendars(PERIOD)
+        getter.load_events()
+
+    assert len(refreshed) == 2
+    assert api.requests == 2 + 2 * 3
+    assert len(getter.events) == 10
+    assert "incremental_sync is not used with fetch_engine = asyncio" in caplog.text
+
+
+def test_batched_getter_follows_pages():
+    with FakeCalendarAPI(calendars=60, events=25, page_size=10) as api:
+        getter = SimpleGCalendarGetter(
+            {**GENERAL_PARAMS, "batch_requests": True, "batch_url": api.batch_url},
+            api.calendar_params,
+        )
+        getter.load_calendars(PERIOD)
+        getter.load_events()
+
+    assert api.requests == 6
+    assert len(getter.events) == 60 * 25
+    for cal_code, events in getter.calendars.items():
+        cal = cal_code[len("CALENDAR") :]
+        assert [e.event_id for e in events] == [f"c{cal}e{n}" for n in range(25)]
+
+
+def test_async_getter_retries_throttled_requests():
+    with FakeCalendarAPI(calendars=2, events=5, throttle=2) as api:
+        getter = AsyncGCalendarGetter({**GENERAL_PARAMS, "api_url": api.url}, api.calendar_params)
+        getter.load_calendars(PERIOD)
+        getter.load_events()
+
+    assert api.requests == 4
+    assert getter.scheduler.throttled == 2
+    assert len(getter.events) == 10
+
+
+def test_local_expansion_matches_single_events():
+    with FakeCalendarAPI(calendars=2, events=20, recurring=0.25, occurrences=5) as api:
+        single = SimpleGCalendarGetter(
+            {**GENERAL_PARAMS, "api_url": api.url, "rate_limit": 0}, api.calendar_params
+        )
+        single.load_calendars(PERIOD)
+        single.load_events()
+        expanded = AsyncGCalendarGetter(
+            {**GENERAL_PARAMS, "api_url": api.url, "expand_recurrence": True},
+            api.calendar_params,
+        )
+        expanded.load_calendars(PERIOD)
+        expanded.load_events()
+
+    assert len(single.events) == 2 * (15 + 5 * 2)
+    assert [(e.event_id, e.start) for e in single.events] == [
+        (e.event_id, e.start) for e in expanded.events
+    ]
+
+
+def test_concurrent_fetch_matches_serial():
+    with FakeCalendarAPI(calendars=4, events=15, page_size=4) as api:
+        getters = []
+        for workers in (1, 4):
+            getter = SimpleGCalendarGetter(
+                {**GENERAL_PARAMS, "api_url": api.url, "rate_limit": 0, "fetch_workers": workers},
+                api.calendar_params,
+            )
+            getter.load_calendars(PERIOD)
+            getter.load_events()
+            getters.append(getter)
+
+    serial, concurrent = getters
+    assert list(concurrent.calendars) == list(serial.calendars) == list(api.calendar_params)
+    assert [(e.cal_code, e.event_id, e.start, e.reminders) for e in concurrent.events] == [
+        (e.cal_code, e.event_id, e.start, e.reminders) for e in serial.events
+    ]
+    assert len(serial.events) == 4 * 15
+
+
+@pytest.mark.parametrize("stream_events", [False, True])
+def test_run_getter_fetches_once_for_both_caches(tmp_path, monkeypatch, stream_events):
+    monkeypatch.setattr(main, "CACHE", tmp_path)
+    yesterday = datetime.combine(date.today() - timedelta(days=1), time(), timezone.utc)
+    with FakeCalendarAPI(calendars=2, events=200, start=yesterday) as api:
+        main.run_getter(
+            {**GENERAL_PARAMS, "api_url": api.url, "stream_events": stream_events},
+            api.calendar_params,
+        )
+
+    assert len(api.queries) == 2
+    items = [
+        {
+            "event_id": item["id"],
+            "start": datetime.fromisoformat(item["start"]["dateTime"]),
+            "end": datetime.fromisoformat(item["end"]["dateTime"]),
+        }
+        for item in chain(*api.items.values())
+    ]
+    cached = {}
+    for name, period in (("notify", "day"), ("print", "month")):
+        in_period = period_filter(define_period(period))
+        events = load_saved_events(tmp_path / f"events_{name}.json")
+        cached[name] = sorted(e["event_id"] for e in events)
+        assert cached[name] == sorted(item["event_id"] for item in items if in_period(item))
+    assert cached["notify"] and cached["notify"] != cached["print"]
+
+
+def fetch_events(api, period=PERIOD, **params):
+    getter = SimpleGCalendarGetter(
+        {**GENERAL_PARAMS, "api_url": api.url, "rate_limit": 0, **params}, api.calendar_params
+    )
+    getter.load_calendars(period)
+    getter.load_events()
+    return [(e.event_id, e.start, e.summary) for e in getter.events]
+
+
+@pytest.mark.parametrize("getter_class", [SimpleGCalendarGetter, AsyncGCalendarGetter])
+def test_getter_requests_only_the_configured_fields(getter_class):
+    with FakeCalendarAPI(calendars=1, events=3) as api:
+        getter = getter_class(
+            {**GENERAL_PARAMS, "api_url": api.url, "fields": ["summary", "start", "end"]},
+            api.calendar_params,
+        )
+        getter.load_calendars(PERIOD)
+        getter.load_events()
+
+    assert (
+        api.queries[-1]["fields"]
+        == "nextPageToken,nextSyncToken,items(id,status,summary,start,end)"
+    )
+    assert [e.summary for e in getter.events] == ["Event 0", "Event 1", "Event 2"]
+    assert all(e.description is None and e.reminders == [] for e in getter.events)
+
+
+def test_extra_fields_are_requested_and_cached(tmp_path):
+    with FakeCalendarAPI(calendars=1, events=2) as api:
+        item = api.items["calendar0@fake"][1]
+        api.update_item("calendar0@fake", {**item, "colorId": "5", "htmlLink": "https://event"})
+        getter = SimpleGCalendarGetter(
+            {
+                **GENERAL_PARAMS,
+                "api_url": api.url,
+                "fields": ["summary", "start", "end"],
+                "extra_fields": ["color_id", "htmlLink"],
+            },
+            api.calendar_params,
+        )
+        getter.load_calendars(PERIOD)
+        getter.load_events()
+
+    assert api.queries[-1]["fields"].endswith("items(id,status,summary,start,end,colorId,htmlLink)")
+    file_path = tmp_path / "events_notify.json"
+    save_events(getter.events, file_path=file_path, extra_fields=["color_id", "htmlLink"])
+    first, second = load_saved_events(file_path)
+    assert (first["color_id"], first["other"]) == (None, {})
+    assert (second["color_id"], second["other"]) == ("5", {"htmlLink": "https://event"})
+
+
+@pytest.mark.parametrize("expand_recurrence", [False, True])
+def test_incremental_sync_applies_changes(tmp_path, monkeypatch, expand_recurrence):
+    monkeypatch.setattr(event_getter, "CACHE", tmp_path)
+    params = {"incremental_sync": True, "expand_recurrence": expand_recurrence}
+    with FakeCalendarAPI(calendars=1, events=6, recurring=0.5, occurrences=2) as api:
+        first = fetch_events(api, **params)
+        assert "syncToken" not in api.queries[-1]
+        assert first == fetch_events(api, expand_recurrence=expand_recurrence)
+
+        calendar_id = "calendar0@fake"
+        api.update_item(calendar_id, {**api.items[calendar_id][0], "summary": "Moved"})
+        api.update_item(calendar_id, api.make_item(0, 6))
+        api.delete_item(calendar_id, "c0e2")
+        api.cancel_occurrence(calendar_id, "c0e1", 1)
+        queries = len(api.queries)
+        synced = fetch_events(api, **params)
+        full = fetch_events(api, expand_recurrence=expand_recurrence)
+
+    assert [("syncToken" in query) for query in api.queries[queries:]] == [True, False]
+    assert synced == full
+    assert len(synced) == len(first) - 1
+    assert ("c0e0", api.start_time, "Moved") in synced
+    assert "c0e2" not in {event_id for event_id, _, _ in synced}
+
+
+def test_incremental_sync_falls_back_to_full_sync(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_getter, "CACHE", tmp_path)
+    with FakeCalendarAPI(calendars=1, events=4) as api:
+        fetch_events(api, incremental_sync=True)
+        api.expire_sync_tokens()
+        api.delete_item("calendar0@fake", "c0e3")
+        queries = len(api.queries)
+        events = fetch_events(api, incremental_sync=True)
+        assert [("syncToken" in query) for query in api.queries[queries:]] == [True, False]
+        assert [event_id for event_id, _, _ in events] == ["c0e0", "c0e1", "c0e2"]
+
+        queries = len(api.queries)
+        fetch_events(api, incremental_sync=True)
+        fetch_events(api, (PERIOD[0], PERIOD[1] + timedelta(days=1)), incremental_sync=True)
+        fetch_events(api, incremental_sync=True, fields=["summary", "start", "end"])
+        fetch_events(api, incremental_sync=True, fields=["summary", "start", "end"])
+    assert [("syncToken" in query) for query in api.queries[queries:]] == [
+        True,
+        False,
+        False,
+        True,
+    ]
+    assert [path.name for path in (tmp_path / "sync").iterdir()] == ["CALENDAR0.json"]
+
+
+def test_client_pool_connects_once_per_account(monkeypatch):
+    connects = []
+    builds = []
+    build = client_pool.discovery.build
+
+    def counting_build(*args, **kwargs):
+        builds.append(kwargs.get("http"))
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(client_pool.discovery, "build", counting_build)
+
+    def make_conn(_calendar, credentials):
+        connects.append(credentials)
+        return SimpleNamespace(credentials=Credentials("token"))
+
+    pool = GoogleCalendarPool(make_conn, RequestScheduler(0))
+    first, other = Path("first.json"), Path("other.json")
+    client = pool.get("a@fake", first)
+    assert pool.get("b@fake", first) is client
+    assert pool.get("c@fake", other) is not client
+
+    thread_clients = []
+    thread = threading.Thread(target=lambda: thread_clients.append(pool.get("a@fake", first)))
+    thread.start()
+    thread.join()
+
+    assert connects == [first, other]
+    assert thread_clients[0] is not client
+    assert thread_clients[0].credentials is client.credentials
+    assert len(builds) == len(pool.clients) == 3
+
+
+@pytest.mark.parametrize("rate", [0, 600])
+def test_throttled_account_waits_for_retry_after(rate):
+    scheduler = RequestScheduler(rate)
+    assert scheduler.reserve("account") == 0
+    assert scheduler.should_retry("account", 0, 429, b"", "30")
+    assert 29 < scheduler.reserve("account") < 31
+    assert scheduler.reserve("other") == 0
@@ -0,0 +1,102 @@
+from datetime import timedelta, timezone
+
+import pytest
+from gcsa.event import Event
+
+from gcal_notifier.event_loader import iter_saved_events, load_reminders, load_saved_events
+from gcal_notifier.event_saver import event_to_dict, save_events, transform_events
+from gcal_notifier.serializers import CachedEvent, LazyEvent, event_timestamp, get_serializer
+from tests.sample_events import START, make_events
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+def test_load_saved_events_in_window(tmp_path, compression):
+    events = make_events(6)
+    events[1].end = START + timedelta(hours=4, minutes=30)
+    file_path = tmp_path / "events_print.json"
+    save_events(
+        events,
+        file_path=file_path,
+        reminder_index=True,
+        compression=compression,
+        cache_format="epoch",
+    )
+
+    window = (START + timedelta(hours=4), START + timedelta(hours=5))
+    loaded = load_saved_events(file_path, *window)
+    assert [event_timestamp(e) for e in loaded] == [
+        (START + timedelta(hours=n)).timestamp() for n in (1, 4)
+    ]
+    if compression == "none":
+        assert all(isinstance(e, LazyEvent) and e.event is None for e in loaded)
+    assert [e["event_id"] for e in loaded] == ["e1", "e4"]
+    assert loaded[0]["end"] == START + timedelta(hours=4, minutes=30)
+
+    assert [e["event_id"] for e in load_saved_events(file_path, end=START)] == []
+    assert len(load_saved_events(file_path, start=START)) == 6
+
+
+def test_table_cache_is_queried_in_place(tmp_path):
+    events = make_events(5)
+    for event in events:
+        event.reminders = [30, 10]
+    events[1].end = START + timedelta(hours=3, minutes=30)
+    file_path = tmp_path / "events_notify.json"
+    save_events(events, file_path=file_path, cache_format="table", reminder_index=True)
+
+    now = START + timedelta(hours=2) - timedelta(minutes=10) + timedelta(seconds=30)
+    assert [e["event_id"] for e in load_reminders(file_path, now)] == ["e2"]
+    assert load_reminders(file_path, now + timedelta(minutes=5)) == []
+
+    window = (START + timedelta(hours=3), START + timedelta(hours=4))
+    loaded = load_saved_events(file_path, *window)
+    assert [e["event_id"] for e in loaded] == ["e1", "e3"]
+    assert loaded[0]["end"] == START + timedelta(hours=3, minutes=30)
+    assert loaded[1]["reminders"] == [30, 10]
+
+
+@pytest.mark.parametrize("cache_format", ["json", "compact_json", "epoch"])
+def test_iter_saved_events_stops_after_window(tmp_path, cache_format):
+    file_path = tmp_path / "events_print.json"
+    save_events(make_events(50), file_path=file_path, cache_format=cache_format)
+    content = file_path.read_bytes()
+    file_path.write_bytes(content[: len(content) // 2])
+
+    window_end = START + timedelta(hours=5)
+    events = iter_saved_events(file_path, START + timedelta(hours=2), window_end, chunk_size=256)
+    assert [e.event_id for e in events] == ["e2", "e3", "e4"]
+
+    compressed_path = tmp_path / "events_compressed.json"
+    save_events(make_events(50), file_path=compressed_path, compression="lzma")
+    assert len(list(iter_saved_events(compressed_path, chunk_size=256))) == 50
+
+
+def test_loaded_events_are_cached_events(tmp_path):
+    event = make_events(1)[0]
+    event.location = "Room 1"
+    event.reminders = [10]
+    file_path = tmp_path / "events_notify.json"
+    save_events([event], file_path=file_path, cache_format="epoch", extra_fields=["location"])
+
+    loaded = load_saved_events(file_path)[0]
+    assert isinstance(loaded, CachedEvent)
+    assert event_timestamp(loaded) == START.timestamp()
+    assert isinstance(loaded._start, int)
+    assert (loaded.event_id, loaded.start, loaded.reminders) == ("e0", START, [10])
+    assert loaded["location"] == "Room 1" and loaded.get("utc_offset") is None
+    assert dict(loaded) == {**event_to_dict(event, ["location"]), "start": START}
+    with pytest.raises(AttributeError):
+        loaded.location = "Room 2"
+
+
+def test_epoch_events_keep_utc_offsets():
+    berlin = timezone(timedelta(hours=2))
+    event = Event("Event", start=START.astimezone(berlin), end=START + timedelta(hours=1))
+    event.reminders = []
+    serializer = get_serializer("epoch")
+
+    loaded = serializer.loads(serializer.dumps(transform_events([event])))[0]
+    assert event_timestamp(loaded) == START.timestamp()
+    assert loaded["start"].utcoffset() == timedelta(hours=2)
+    assert loaded.get("end").utcoffset() == timedelta(0)
+    assert loaded["end"] - loaded["start"] == timedelta(hours=1)
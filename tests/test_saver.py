@@ -0,0 +1,180 @@
+import json
+from datetime import timedelta
+
+import pytest
+from gcsa.event import Event
+
+from gcal_notifier.event_loader import load_events_file, load_reminders, load_saved_events
+from gcal_notifier.event_saver import (
+    EventStreamWriter,
+    date_to_datetime,
+    event_to_dict,
+    index_path,
+    merge_events,
+    period_filter,
+    save_events,
+    save_events_stream,
+)
+from gcal_notifier.serializers import get_serializer
+from tests.sample_events import START, make_events
+
+
+def test_save_events_skips_unchanged_content(tmp_path):
+    file_path = tmp_path / "events_notify.json"
+    save_events(make_events(3), file_path=file_path)
+    written = file_path.stat().st_mtime_ns
+
+    save_events(make_events(3), file_path=file_path)
+    assert file_path.stat().st_mtime_ns == written
+
+    save_events(make_events(4), file_path=file_path)
+    assert len(json.loads(file_path.read_text())) == 4
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+
+def test_stream_keeps_old_file_on_error(tmp_path):
+    file_path = tmp_path / "events_notify.json"
+    save_events(make_events(2), file_path=file_path)
+    content = file_path.read_text()
+
+    def failing_stream():
+        yield from make_events(1)
+        raise ConnectionError
+
+    period = (START.date(), START.date() + timedelta(days=1))
+    with pytest.raises(ConnectionError):
+        save_events_stream([failing_stream()], {file_path: period})
+    assert file_path.read_text() == content
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        ".events_notify.json.sha256",
+        "events_notify.json",
+    ]
+
+
+@pytest.mark.parametrize(
+    "cache_format", ["json", "compact_json", "epoch", "binary", "msgpack", "table"]
+)
+def test_cache_formats_round_trip(tmp_path, cache_format):
+    if cache_format == "msgpack":
+        pytest.importorskip("msgpack")
+    file_path = tmp_path / "events_notify.json"
+    save_events(make_events(3), file_path=file_path, cache_format=cache_format)
+
+    events = load_saved_events(file_path)
+    assert [e["event_id"] for e in events] == ["e0", "e1", "e2"]
+    if not get_serializer(cache_format).indexable:
+        with pytest.raises(TypeError):
+            get_serializer(cache_format).load_event(b"{}")
+    assert [e["start"] for e in events] == [START + timedelta(hours=n) for n in range(3)]
+
+    period = (START.date(), START.date() + timedelta(days=1))
+    stream_path = tmp_path / "events_stream.json"
+    save_events_stream([make_events(3)], {stream_path: period}, cache_format)
+    assert stream_path.read_bytes() == file_path.read_bytes()
+
+
+def test_stream_writes_each_event_as_it_is_read(tmp_path, monkeypatch):
+    read = []
+    written = []
+    original_write = EventStreamWriter.write
+
+    def stream():
+        for event in make_events(5):
+            read.append(event.event_id)
+            yield event
+
+    def write(writer, event):
+        written.append((event["event_id"], len(read)))
+        original_write(writer, event)
+
+    monkeypatch.setattr(EventStreamWriter, "write", write)
+    file_path = tmp_path / "events_notify.json"
+    period = (START.date(), START.date() + timedelta(days=1))
+    save_events_stream([stream()], {file_path: period})
+
+    assert written == [(f"e{num}", num + 1) for num in range(5)]
+    assert [e["event_id"] for e in load_saved_events(file_path)] == read
+
+
+def test_stream_table_to_several_files(tmp_path):
+    events = make_events(30)
+    files = {
+        tmp_path / "events_notify.json": (START.date(), START.date() + timedelta(days=1)),
+        tmp_path / "events_print.json": (START.date(), START.date() + timedelta(days=3)),
+    }
+    save_events_stream([events], files, "table")
+
+    for file_path, period in files.items():
+        in_period = period_filter(period)
+        expected = [e.event_id for e in events if in_period(event_to_dict(e))]
+        assert [e["event_id"] for e in load_saved_events(file_path)] == expected
+    notify, printed = (load_saved_events(file_path) for file_path in files)
+    assert 0 < len(notify) < len(printed) == 30
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma", "zstd"])
+def test_compressed_cache_round_trip(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    file_path = tmp_path / "events_print.json"
+    save_events(make_events(3), file_path=file_path, reminder_index=True, compression=compression)
+
+    assert not file_path.read_bytes().startswith(b"[")
+    assert not index_path(file_path).exists()
+    assert [e["event_id"] for e in load_events_file(file_path)] == ["e0", "e1", "e2"]
+    epoch_path = tmp_path / "events_epoch.json"
+    save_events(make_events(3), file_path=epoch_path, cache_format="epoch", compression=compression)
+    with pytest.raises(ValueError, match="epoch"):
+        load_events_file(epoch_path)
+    assert load_saved_events(file_path)[2]["start"] == START + timedelta(hours=2)
+
+    period = (START.date(), START.date() + timedelta(days=1))
+    stream_path = tmp_path / "events_stream.json"
+    save_events_stream(
+        [make_events(3)], {stream_path: period}, "json", [], (), compression, [stream_path]
+    )
+    assert stream_path.read_bytes() == file_path.read_bytes()
+
+
+@pytest.mark.parametrize("cache_format", ["json", "compact_json", "epoch", "binary"])
+def test_reminder_index_finds_current_reminders(tmp_path, cache_format):
+    events = make_events(5)
+    for event in events:
+        event.reminders = [30, 10]
+    file_path = tmp_path / "events_notify.json"
+    save_events(events, file_path=file_path, cache_format=cache_format, reminder_index=True)
+
+    now = START + timedelta(hours=2) - timedelta(minutes=10) + timedelta(seconds=30)
+    assert [e["event_id"] for e in load_reminders(file_path, now)] == ["e2"]
+    assert load_reminders(file_path, now + timedelta(minutes=5)) == []
+
+    period = (START.date(), START.date() + timedelta(days=1))
+    save_events_stream([events], {file_path: period}, cache_format, [file_path])
+    assert [e["event_id"] for e in load_reminders(file_path, now)] == ["e2"]
+
+    save_events(events[:2], file_path=file_path, cache_format=cache_format)
+    assert load_reminders(file_path, now) is None
+
+
+def test_merge_events_merges_sorted_calendars():
+    all_day = Event("Holiday", start=START.date() - timedelta(days=1), event_id="holiday")
+    calendars = [make_events(3)[::2], [all_day, *make_events(2)[1:]]]
+
+    merged = list(merge_events(calendars))
+    assert [e["event_id"] for e in merged] == ["holiday", "e0", "e1", "e2"]
+    assert merged[0]["start"] == date_to_datetime(all_day.start)
+    assert all_day.start == START.date() - timedelta(days=1)
+
+
+def test_event_record_keeps_only_asked_fields():
+    event = make_events(1)[0]
+    event.location = "Room 1"
+    event.other = {"hangoutLink": "https://meet", "htmlLink": "https://event"}
+
+    record = event_to_dict(event)
+    assert "attendees" not in record and "location" not in record
+    assert record["other"] == {"hangoutLink": "https://meet"}
+
+    record = event_to_dict(event, ["location", "htmlLink"])
+    assert record["location"] == "Room 1"
+    assert record["other"]["htmlLink"] == "https://event"
@@ -0,0 +1,90 @@
+import sqlite3
+from datetime import timedelta
+
+import pytest
+from gcsa.event import Event
+
+from gcal_notifier.event_loader import load_events_db, load_events_shards, load_reminders_db
+from gcal_notifier.event_saver import save_events_db, save_events_shards, transform_events
+from gcal_notifier.event_store import SQLiteEventStore
+from tests.sample_events import START, make_events
+
+
+def test_event_store_range_queries(tmp_path):
+    db_path = tmp_path / "events.db"
+    events = make_events(5)
+    for num, event in enumerate(events):
+        event.reminders = [10]
+        event.cal_code = f"CALENDAR{num % 2}"
+    period = (START.date(), START.date() + timedelta(days=1))
+    save_events_db(events, period, db_path)
+
+    window = (START + timedelta(hours=1), START + timedelta(hours=3))
+    assert [e["event_id"] for e in load_events_db(window, path=db_path)] == ["e1", "e2"]
+    assert [e["event_id"] for e in load_events_db(window, ["CALENDAR0"], db_path)] == ["e2"]
+
+    now = START + timedelta(hours=3) - timedelta(minutes=10)
+    assert [e["event_id"] for e in load_reminders_db(now, db_path)] == ["e3"]
+    assert load_reminders_db(now + timedelta(minutes=1), db_path) == []
+
+    save_events_db(events[:3], period, db_path)
+    assert load_reminders_db(now, db_path) == []
+    assert len(load_events_db(period=(START, START + timedelta(days=1)), path=db_path)) == 3
+
+
+def test_event_store_reads_without_write_access(tmp_path):
+    store = SQLiteEventStore(tmp_path / "events.db")
+    assert store.events_between(START, START + timedelta(days=1)) == []
+    assert not store.path.exists()
+
+    events = make_events(2)
+    for event in events:
+        event.cal_code = "CALENDAR0"
+    store.save(transform_events(events), (START, START + timedelta(days=1)))
+    conn = store.connect(read_only=True)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("DELETE FROM events")
+    finally:
+        conn.close()
+    assert [e["event_id"] for e in store.events_between(START, START + timedelta(days=1))] == [
+        "e0",
+        "e1",
+    ]
+
+
+def test_shards_write_changed_days_and_load_requested_days(tmp_path):
+    events = [
+        Event(f"Event {num}", start=START + timedelta(days=num), event_id=f"e{num}")
+        for num in range(3)
+    ]
+    events.append(
+        Event("Trip", start=START, end=START + timedelta(days=1, hours=1), event_id="trip")
+    )
+    day = START.date()
+    period = (day, day + timedelta(days=3))
+    save_events_shards(transform_events(events), period, "epoch", tmp_path)
+
+    loaded = load_events_shards((day + timedelta(days=1), day + timedelta(days=1)), tmp_path)
+    assert [e["event_id"] for e in loaded] == ["trip", "e1"]
+    assert [e["event_id"] for e in load_events_shards(period, tmp_path)] == [
+        "e0",
+        "trip",
+        "e1",
+        "e2",
+    ]
+
+    first_shard = tmp_path / f"{day.isoformat()}.events"
+    written = first_shard.stat().st_mtime_ns
+    events[2].summary = "Moved"
+    save_events_shards(transform_events(events), period, "epoch", tmp_path)
+    assert first_shard.stat().st_mtime_ns == written
+    assert (
+        load_events_shards((period[1] - timedelta(days=1),) * 2, tmp_path)[0]["summary"] == "Moved"
+    )
+
+    save_events_shards(
+        transform_events(events[2:3]), (day + timedelta(days=2), period[1]), "epoch", tmp_path
+    )
+    assert not first_shard.exists()
+    assert [e["event_id"] for e in load_events_shards(period, tmp_path)] == ["e2"]